@@ -1,11 +1,12 @@
 #!/usr/bin/env python3
 """Bandwidth testing and optimization for proxy selection."""
 import asyncio
+import functools
 import logging
 import random
-import statistics
-import time
-from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
+import ssl
+import urllib.parse
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Set, Tuple
 
 import aiohttp
 import aiohttp_socks
@@ -15,6 +16,70 @@ if TYPE_CHECKING:
 
 logger = logging.getLogger(__name__)
 
+# Longest status line plus headers accepted before the raw download gives up
+_MAX_RESPONSE_HEAD = 64 << 10
+
+
+class _DiscardProtocol(asyncio.BufferedProtocol):
+    """Receives a download into one reused buffer, counting the bytes and discarding them"""
+
+    def __init__(
+        self,
+        buffer: bytearray,
+        on_progress: Optional[Callable[[int], None]],
+        progress_bytes: int,
+    ) -> None:
+        self._buffer = buffer
+        self._on_progress = on_progress
+        self._progress_bytes = progress_bytes
+        self._next_report = progress_bytes
+        self._transport: Optional[asyncio.BaseTransport] = None
+        # Status line and headers received so far; None once the body starts
+        self._head: Optional[bytearray] = bytearray()
+        self.total_bytes = 0
+        self.status_ok: Optional[bool] = None
+        self.done: 'asyncio.Future[None]' = asyncio.get_running_loop().create_future()
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self._transport = transport
+
+    def get_buffer(self, sizehint: int) -> bytearray:
+        return self._buffer
+
+    def buffer_updated(self, nbytes: int) -> None:
+        if self._head is not None:
+            nbytes = self._read_head(self._head, nbytes)
+            if not nbytes:
+                return
+        self.total_bytes += nbytes
+        if self._on_progress and self.total_bytes >= self._next_report:
+            self._on_progress(self.total_bytes)
+            self._next_report = self.total_bytes + self._progress_bytes
+
+    def _read_head(self, head: bytearray, nbytes: int) -> int:
+        """Buffer the response head across reads and return how many body bytes followed it"""
+        head += self._buffer[:nbytes]
+        if self.status_ok is None:
+            line_end = head.find(b"\r\n")
+            if line_end >= 0:
+                # e.g. b"HTTP/1.1 200 OK"
+                fields = bytes(head[:line_end]).split(b" ", 2)
+                self.status_ok = len(fields) > 1 and fields[1] == b"200"
+        head_end = head.find(b"\r\n\r\n")
+        if self.status_ok is False or (head_end < 0 and len(head) > _MAX_RESPONSE_HEAD):
+            self.status_ok = False
+            if self._transport is not None:
+                self._transport.close()
+            return 0
+        if head_end < 0:
+            return 0
+        self._head = None
+        return len(head) - head_end - 4
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        if not self.done.done():
+            self.done.set_result(None)
+
 
 class BandwidthTester:
     """Measures connection bandwidth and provides optimal proxy counts"""
@@ -29,6 +94,30 @@ class BandwidthTester:
     # Test duration in seconds
     TEST_DURATION = 5
 
+    # Measure direct bandwidth over a raw socket instead of through aiohttp
+    RAW_SOCKET_TEST = True
+
+    # Seconds allowed for a test URL to answer the HEAD race
+    URL_PROBE_TIMEOUT = 2
+
+    # Seconds the winning test URL is reused before racing again
+    URL_CACHE_TTL = 300
+
+    # Read buffer size for test downloads
+    READ_BUFSIZE = 1 << 20
+
+    # Report download progress once per this many bytes
+    PROGRESS_BYTES = 8 << 20
+
+    # Number of proxies sampled (and probed concurrently) per measurement
+    PROXY_SAMPLE_SIZE = 5
+
+    # Relative bandwidth change below which the optimal count is reused
+    RECALC_TOLERANCE = 0.05
+
+    # Upper bound for the backed-off interval between optimization cycles
+    MAX_OPTIMIZATION_INTERVAL = 3600
+
     def __init__(self, max_proxies: int = 100):
         """Initialize the bandwidth tester
 
@@ -40,32 +129,240 @@ class BandwidthTester:
         self.proxy_avg_bandwidth_mbps: float = 0.0
         self.optimal_proxy_count = 1
         self.progress_callback: Optional[Callable[[str, Dict[str, Any]], None]] = None
+        # Long-lived sessions so repeated probes reuse pooled connections
+        self._session: Optional[aiohttp.ClientSession] = None
+        # Proxied sessions by connection string, with the URL they were built for
+        self._proxy_sessions: Dict[str, Tuple[str, aiohttp.ClientSession]] = {}
+        # Caps concurrent proxy probes so they don't saturate the uplink
+        self._probe_semaphore = asyncio.Semaphore(self.PROXY_SAMPLE_SIZE)
+        # (user Mbps, proxy avg Mbps, available proxies, max proxies) behind optimal_proxy_count
+        self._last_inputs: Optional[Tuple[float, float, int, int]] = None
+        # Fastest responding test URL and the loop time it was picked
+        self._fastest_url: Optional[str] = None
+        self._fastest_url_at = 0.0
+
+    async def _get_session(
+        self, proxy: Optional['ProxyInfo'] = None
+    ) -> aiohttp.ClientSession:
+        """Get the cached session for direct or proxied requests, creating it if needed"""
+        timeout = aiohttp.ClientTimeout(total=self.TEST_DURATION + 2)
+        if proxy is None:
+            if self._session is None or self._session.closed:
+                connector = aiohttp.TCPConnector(
+                    limit=0, ttl_dns_cache=300, force_close=False
+                )
+                self._session = aiohttp.ClientSession(
+                    connector=connector, timeout=timeout, read_bufsize=self.READ_BUFSIZE
+                )
+            return self._session
+
+        key = proxy.connection_string()
+        url = proxy.resolved_connection_string()
+        cached = self._proxy_sessions.get(key)
+        if cached is not None and cached[0] == url and not cached[1].closed:
+            return cached[1]
+        if cached is not None:
+            # The proxy address changed since the session was created
+            await cached[1].close()
+        connector = aiohttp_socks.ProxyConnector.from_url(url)
+        session = aiohttp.ClientSession(
+            connector=connector, timeout=timeout, read_bufsize=self.READ_BUFSIZE
+        )
+        self._proxy_sessions[key] = (url, session)
+        return session
+
+    async def close(self) -> None:
+        """Close all cached HTTP sessions"""
+        sessions = [session for _, session in self._proxy_sessions.values()]
+        if self._session is not None:
+            sessions.append(self._session)
+        self._session = None
+        self._proxy_sessions.clear()
+        for session in sessions:
+            try:
+                await session.close()
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                logger.debug("Error closing bandwidth test session: %s", e)
+
+    async def _raw_download(
+        self, url: str, on_progress: Optional[Callable[[int], None]]
+    ) -> int:
+        """Download url for TEST_DURATION seconds over a plain (TLS) socket and return the bytes read
+
+        Only the status line is parsed: each read lands in the same buffer and
+        the body bytes after the headers are counted, which skips aiohttp's
+        HTTP parser and per-chunk bytes objects. Raises OSError if the server
+        does not answer with 200.
+        """
+        parts = urllib.parse.urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"Unsupported test URL: {url}")
+        https = parts.scheme == "https"
+        ssl_context = ssl.create_default_context() if https else None
+        port = parts.port or (443 if https else 80)
+        path = parts.path or "/"
+        if parts.query:
+            path = f"{path}?{parts.query}"
+
+        loop = asyncio.get_running_loop()
+        protocol = _DiscardProtocol(
+            bytearray(self.READ_BUFSIZE), on_progress, self.PROGRESS_BYTES
+        )
+        transport, _ = await asyncio.wait_for(
+            loop.create_connection(lambda: protocol, parts.hostname, port, ssl=ssl_context),
+            timeout=self.URL_PROBE_TIMEOUT,
+        )
+        try:
+            transport.write(
+                f"GET {path} HTTP/1.1\r\nHost: {parts.netloc}\r\n"
+                "Connection: close\r\n\r\n".encode("ascii")
+            )
+            # Returns at the deadline, or earlier if the server closes first
+            await asyncio.wait({protocol.done}, timeout=self.TEST_DURATION)
+        finally:
+            transport.close()
+
+        if not protocol.status_ok:
+            raise ConnectionError(f"Unexpected response from {url}")
+        return protocol.total_bytes
+
+    async def _probe_url(self, session: aiohttp.ClientSession, url: str) -> str:
+        """Send a HEAD request to a test URL and return the URL if it answers"""
+        timeout = aiohttp.ClientTimeout(total=self.URL_PROBE_TIMEOUT)
+        async with session.head(url, timeout=timeout, allow_redirects=True) as response:
+            response.raise_for_status()
+        return url
+
+    async def _choose_test_url(self) -> str:
+        """Pick the test URL that answers a HEAD request first
+
+        The winner is cached for URL_CACHE_TTL seconds. If no URL answers,
+        one is picked at random as before.
+        """
+        loop = asyncio.get_running_loop()
+        if self._fastest_url and loop.time() - self._fastest_url_at < self.URL_CACHE_TTL:
+            return self._fastest_url
+
+        winner: Optional[str] = None
+        tasks: List['asyncio.Future[str]'] = []
+        try:
+            session = await self._get_session()
+            tasks = [asyncio.ensure_future(self._probe_url(session, url)) for url in self.TEST_URLS]
+            pending: Set['asyncio.Future[str]'] = set(tasks)
+            while pending and winner is None:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if not task.cancelled() and task.exception() is None:
+                        winner = task.result()
+                        break
+                    if not task.cancelled():
+                        logger.debug("Test URL probe failed: %s", task.exception())
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            logger.debug("Error racing test URLs: %s", e)
+        finally:
+            for task in tasks:
+                task.cancel()
+            # Retrieve every probe's outcome, including failures left behind
+            # by the early exit, so none is logged as never retrieved
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        if winner is None:
+            return random.choice(self.TEST_URLS)
+        self._fastest_url = winner
+        self._fastest_url_at = loop.time()
+        return winner
+
+    async def _read_until_deadline(
+        self, response: aiohttp.ClientResponse, on_progress: Optional[Callable[[int], None]]
+    ) -> int:
+        """Stream a response body for TEST_DURATION seconds and return the bytes read
+
+        A timer closes the response once the test window is over, so the read
+        loop itself never has to check the clock. The payload is discarded, so
+        buffers are taken as received rather than copied into fixed-size chunks.
+        """
+        loop = asyncio.get_running_loop()
+        total_bytes = 0
+        next_report = self.PROGRESS_BYTES
+        expired = False
+
+        def expire() -> None:
+            nonlocal expired
+            expired = True
+            response.close()
+
+        deadline = loop.call_later(self.TEST_DURATION, expire)
+        try:
+            async for chunk in response.content.iter_any():
+                total_bytes += len(chunk)
+                if on_progress and total_bytes >= next_report:
+                    on_progress(total_bytes)
+                    next_report = total_bytes + self.PROGRESS_BYTES
+        except asyncio.TimeoutError:
+            # The session timeout also ends the test window
+            pass
+        except aiohttp.ClientError:
+            # Closing the response at the deadline aborts the pending read
+            if not expired:
+                raise
+        finally:
+            deadline.cancel()
+        return total_bytes
+
+    @staticmethod
+    def _report_user_progress(
+        progress_callback: Callable[[str, Dict[str, Any]], None],
+        start_time: float,
+        received: int,
+    ) -> None:
+        """Forward direct download progress to the progress callback"""
+        elapsed = asyncio.get_running_loop().time() - start_time
+        progress_callback("user_bandwidth_progress", {"bytes": received, "elapsed": elapsed})
+
+    @staticmethod
+    def _report_proxy_progress(
+        progress_callback: Callable[[str, Dict[str, Any]], None],
+        proxy: str,
+        idx: int,
+        received: int,
+    ) -> None:
+        """Forward proxy download progress to the progress callback"""
+        progress_callback(
+            "proxy_bandwidth_progress", {"proxy": proxy, "bytes": received, "idx": idx}
+        )
 
     async def measure_connection_speed(
         self, progress_callback: Optional[Callable[[str, Dict[str, Any]], None]] = None
     ) -> float:
         """Measure the user's direct connection speed in Mbps"""
-        url = random.choice(self.TEST_URLS)
+        url = await self._choose_test_url()
         total_bytes = 0
-        start_time = time.time()
-        end_time = start_time + self.TEST_DURATION
+        loop = asyncio.get_running_loop()
+        start_time = loop.time()
         if progress_callback:
             progress_callback("start_user_bandwidth_test", {"url": url})
+
+        on_progress: Optional[Callable[[int], None]] = None
+        if progress_callback:
+            on_progress = functools.partial(
+                self._report_user_progress, progress_callback, start_time
+            )
+        raw_bytes: Optional[int] = None
+        if self.RAW_SOCKET_TEST:
+            try:
+                raw_bytes = await self._raw_download(url, on_progress)
+            except (OSError, ValueError, asyncio.TimeoutError) as e:
+                logger.debug("Raw socket speed test failed, using aiohttp: %s", e)
+                start_time = loop.time()
         try:
-            timeout = aiohttp.ClientTimeout(total=self.TEST_DURATION + 2)
-            async with aiohttp.ClientSession(timeout=timeout) as session:
+            if raw_bytes is not None:
+                total_bytes = raw_bytes
+            else:
+                session = await self._get_session()
                 async with session.get(url) as response:
-                    while time.time() < end_time:
-                        chunk = await response.content.read(1024 * 1024)
-                        if not chunk:
-                            break
-                        total_bytes += len(chunk)
-                        if progress_callback:
-                            elapsed = time.time() - start_time
-                            progress_callback(
-                                "user_bandwidth_progress",
-                                {"bytes": total_bytes, "elapsed": elapsed},
-                            )
+                    total_bytes = await self._read_until_deadline(response, on_progress)
         except asyncio.TimeoutError:
             # This is expected as we're canceling after TEST_DURATION
             pass
@@ -73,7 +370,7 @@ class BandwidthTester:
             logger.error("Error measuring connection speed: %s", e)
             return 0
 
-        elapsed_time = time.time() - start_time
+        elapsed_time = loop.time() - start_time
         if elapsed_time <= 0:
             return 0
 
@@ -85,63 +382,73 @@ class BandwidthTester:
             progress_callback("user_bandwidth_done", {"mbps": mbps})
         return mbps
 
-    async def measure_proxy_speeds(
+    async def _probe_one(
         self,
-        proxies: List['ProxyInfo'],
-        progress_callback: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+        proxy: 'ProxyInfo',
+        idx: int,
+        test_url: str,
+        progress_callback: Optional[Callable[[str, Dict[str, Any]], None]],
     ) -> float:
-        """Measure the average bandwidth of proxies in Mbps
-
-        This is a simplified estimation - in a real implementation, you would
-        need to test through each proxy using the SOCKS protocol
-        """
-        proxy_speeds = []
-        test_url = random.choice(self.TEST_URLS)
-        for idx, proxy in enumerate(proxies[: min(5, len(proxies))]):
-            speed = 0.0
+        """Measure the bandwidth of a single proxy in Mbps (0.0 on failure)"""
+        speed = 0.0
+        on_progress: Optional[Callable[[int], None]] = None
+        if progress_callback:
+            on_progress = functools.partial(
+                self._report_proxy_progress, progress_callback, str(proxy), idx
+            )
+        async with self._probe_semaphore:
+            loop = asyncio.get_running_loop()
             try:
-                timeout = aiohttp.ClientTimeout(total=self.TEST_DURATION + 2)
-                connector = aiohttp_socks.ProxyConnector.from_url(
-                    proxy.connection_string()
-                )
-                start_time = time.time()
-                total_bytes = 0
-                async with aiohttp.ClientSession(
-                    connector=connector, timeout=timeout
-                ) as session:
-                    async with session.get(test_url) as response:
-                        while time.time() - start_time < self.TEST_DURATION:
-                            chunk = await response.content.read(1024 * 1024)
-                            if not chunk:
-                                break
-                            total_bytes += len(chunk)
-                            if progress_callback:
-                                progress_callback(
-                                    "proxy_bandwidth_progress",
-                                    {
-                                        "proxy": str(proxy),
-                                        "bytes": total_bytes,
-                                        "idx": idx,
-                                    },
-                                )
-                elapsed = time.time() - start_time
+                session = await self._get_session(proxy)
+                start_time = loop.time()
+                async with session.get(test_url) as response:
+                    total_bytes = await self._read_until_deadline(response, on_progress)
+                elapsed = loop.time() - start_time
                 if elapsed > 0:
                     speed = (total_bytes * 8) / (elapsed * 1000 * 1000)
             except Exception as e:  # pylint: disable=broad-exception-caught
                 logger.error("Error testing proxy %s: %s", proxy, e)
                 speed = 0.0
-            proxy_speeds.append(speed)
-            if progress_callback:
-                progress_callback(
-                    "proxy_bandwidth_done",
-                    {"proxy": str(proxy), "mbps": speed, "idx": idx},
-                )
+        if progress_callback:
+            progress_callback(
+                "proxy_bandwidth_done",
+                {"proxy": str(proxy), "mbps": speed, "idx": idx},
+            )
+        return speed
+
+    async def measure_proxy_speeds(
+        self,
+        proxies: List['ProxyInfo'],
+        progress_callback: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+    ) -> float:
+        """Measure the average bandwidth of proxies in Mbps
 
-        if not proxy_speeds:
+        A sample of up to PROXY_SAMPLE_SIZE proxies is probed concurrently,
+        so a measurement takes roughly TEST_DURATION regardless of sample size.
+        """
+        sample = proxies[: min(self.PROXY_SAMPLE_SIZE, len(proxies))]
+        if not sample:
             # Default assumption if we have no data
             return 5.0
 
-        avg_speed = statistics.mean([s for s in proxy_speeds if s > 0] or [5.0])
+        test_url = await self._choose_test_url()
+        results = await asyncio.gather(
+            *(
+                self._probe_one(proxy, idx, test_url, progress_callback)
+                for idx, proxy in enumerate(sample)
+            ),
+            return_exceptions=True,
+        )
+        proxy_speeds = [r if isinstance(r, float) else 0.0 for r in results]
+
+        # Average over successful probes only, in a single pass
+        total = 0.0
+        count = 0
+        for speed in proxy_speeds:
+            if speed > 0:
+                total += speed
+                count += 1
+        avg_speed = total / count if count else 5.0
         logger.info("Average proxy speed: %.2f Mbps", avg_speed)
         self.proxy_avg_bandwidth_mbps = avg_speed
         if progress_callback:
@@ -154,6 +461,16 @@ class BandwidthTester:
             # Default to using all available proxies if we don't have bandwidth data
             return min(len(available_proxies), self.max_proxies)
 
+        if self._last_inputs is not None:
+            last_user, last_avg, last_available, last_max = self._last_inputs
+            if (
+                last_available == len(available_proxies)
+                and last_max == self.max_proxies
+                and abs(self.user_bandwidth_mbps - last_user) < last_user * self.RECALC_TOLERANCE
+                and abs(self.proxy_avg_bandwidth_mbps - last_avg) < last_avg * self.RECALC_TOLERANCE
+            ):
+                return self.optimal_proxy_count
+
         # Calculate how many proxies we need to saturate the connection
         # Add a 20% buffer to account for overhead
         needed_proxies = int(
@@ -173,6 +490,12 @@ class BandwidthTester:
         )
 
         self.optimal_proxy_count = optimal_count
+        self._last_inputs = (
+            self.user_bandwidth_mbps,
+            self.proxy_avg_bandwidth_mbps,
+            len(available_proxies),
+            self.max_proxies,
+        )
         return optimal_count
 
     async def run_continuous_optimization(
@@ -181,7 +504,14 @@ class BandwidthTester:
         interval: int = 60,
         progress_callback: Optional[Callable[[str, Dict[str, Any]], None]] = None,
     ) -> None:
-        """Continuously test and optimize proxies until bandwidth is saturated. Calls progress_callback with status."""
+        """Continuously test and optimize proxies until bandwidth is saturated. Calls progress_callback with status.
+
+        While consecutive cycles keep arriving at the same proxy count, the
+        wait between cycles doubles (up to MAX_OPTIMIZATION_INTERVAL); any
+        change resets it to interval.
+        """
+        delay = interval
+        last_count: Optional[int] = None
         while True:
             if progress_callback:
                 progress_callback("cycle_start", {})
@@ -198,4 +528,9 @@ class BandwidthTester:
                         "total_proxies": len(proxies),
                     },
                 )
-            await asyncio.sleep(interval)
+            if optimal_count == last_count:
+                delay = min(delay * 2, max(interval, self.MAX_OPTIMIZATION_INTERVAL))
+            else:
+                delay = interval
+            last_count = optimal_count
+            await asyncio.sleep(delay)
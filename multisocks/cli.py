@@ -2,15 +2,21 @@
 """Command-line interface for MultiSocks proxy server."""
 import argparse
 import asyncio
+import functools
 import logging
+import multiprocessing
+import os
 import re
+import socket
 import sys
-from typing import Any, Dict, List, Optional, Tuple
+import time
+from typing import Any, Coroutine, Dict, Iterable, Iterator, List, Optional, Tuple
 
 from colorama import Fore, Style
 from colorama import init as colorama_init
 
 from multisocks.proxy import ProxyInfo, ProxyManager, SocksServer
+from multisocks.proxy.proxy_info import SUPPORTED_PROTOCOLS
 from multisocks import __version__
 
 # Initialize colorama for cross-platform colored terminal output
@@ -24,11 +30,59 @@ logging.basicConfig(
 )
 logger = logging.getLogger("multisocks")
 
+# Trailing "/<weight>" suffix of a proxy string
+_WEIGHT_RE = re.compile(r"/(-?\d+)$")
+
+# Where latency and bandwidth measurements are kept between runs
+DEFAULT_STATE_FILE = os.path.join(os.path.expanduser("~"), ".multisocks", "state.json")
+
+# Seconds a worker process gets to shut down cleanly before it is terminated
+WORKER_SHUTDOWN_TIMEOUT = 10.0
+
+# Minimum seconds between in-place bandwidth progress lines
+PROGRESS_PRINT_INTERVAL = 0.1
+
+# Output for optimization progress events, %-formatted against the event data
+_EVENT_LINES = {
+    "cycle_start": (
+        f"{Fore.YELLOW}--- Bandwidth/Proxy Optimization Cycle Started ---{Style.RESET_ALL}"
+    ),
+    "user_bandwidth_done": f"{Fore.GREEN}User bandwidth: %(mbps).2f Mbps{Style.RESET_ALL}",
+    "proxy_bandwidth_done": (
+        f"{Fore.GREEN}Proxy %(proxy)s bandwidth: %(mbps).2f Mbps{Style.RESET_ALL}"
+    ),
+    "proxy_bandwidth_avg": f"{Fore.GREEN}Average proxy bandwidth: %(mbps).2f Mbps{Style.RESET_ALL}",
+    "cycle_done": (
+        f"{Fore.YELLOW}Cycle done. User: %(user_bandwidth_mbps).2f Mbps, "
+        "Proxy avg: %(proxy_avg_bandwidth_mbps).2f Mbps, "
+        f"Optimal proxies: %(optimal_proxy_count)s/%(total_proxies)s{Style.RESET_ALL}"
+    ),
+}
+
+# In-place (overwritten) download progress lines; "mb" is derived from "bytes"
+_PROGRESS_LINES = {
+    "user_bandwidth_progress": (
+        f"{Fore.CYAN}Testing user bandwidth: %(mb)d MB downloaded...{Style.RESET_ALL}\r"
+    ),
+    "proxy_bandwidth_progress": f"{Fore.CYAN}Testing proxy %(proxy)s: %(mb)d MB...{Style.RESET_ALL}\r",
+}
+
+# Values used for any field an event leaves out
+_EVENT_DEFAULTS: Dict[str, Any] = {
+    "proxy": "",
+    "bytes": 0,
+    "mbps": 0,
+    "user_bandwidth_mbps": 0,
+    "proxy_avg_bandwidth_mbps": 0,
+    "optimal_proxy_count": 0,
+    "total_proxies": 0,
+}
+
 
 def _extract_weight(proxy_str: str) -> Tuple[str, int]:
     """Extract weight from proxy string, return (proxy_str_without_weight, weight)"""
     weight = 1
-    weight_match = re.search(r"/(-?\d+)$", proxy_str)
+    weight_match = _WEIGHT_RE.search(proxy_str)
     if weight_match:
         try:
             potential_weight = int(weight_match.group(1))
@@ -44,7 +98,7 @@ def _extract_weight(proxy_str: str) -> Tuple[str, int]:
 
 def _validate_protocol(protocol: str) -> None:
     """Validate that the protocol is supported"""
-    if protocol not in ("socks4", "socks4a", "socks5", "socks5h"):
+    if protocol not in SUPPORTED_PROTOCOLS:
         raise ValueError(f"Unsupported protocol: {protocol}")
 
 
@@ -52,10 +106,8 @@ def _parse_auth(auth_part: Optional[str]) -> Tuple[Optional[str], Optional[str]]
     """Parse authentication part, return (username, password)"""
     if not auth_part:
         return None, None
-    if ":" in auth_part:
-        parts = auth_part.split(":", 1)
-        return parts[0], parts[1] if len(parts) > 1 else None
-    return auth_part, None
+    username, colon, password = auth_part.partition(":")
+    return (username, password) if colon else (auth_part, None)
 
 
 def _validate_port(port_str: str) -> int:
@@ -76,26 +128,22 @@ def parse_proxy_string(proxy_str: str) -> ProxyInfo:
     # Extract weight
     proxy_str, weight = _extract_weight(proxy_str)
 
-    # Split by '://' to separate protocol from the rest
-    if "://" not in proxy_str:
+    # Each separator is located with a single partition scan, no split lists
+    protocol_part, sep, rest = proxy_str.partition("://")
+    if not sep:
         raise ValueError(f"Invalid proxy format: {original_proxy_str}")
-
-    protocol_part, rest = proxy_str.split("://", 1)
     _validate_protocol(protocol_part)
 
-    # Find the last '@' to separate auth from host:port
-    auth_part, host_port = rest.rsplit("@", 1) if "@" in rest else (None, rest)
+    # The last '@' separates auth from host:port
+    auth_part, at, host_port = rest.rpartition("@")
 
     # Parse host and port
-    if ":" not in host_port:
-        raise ValueError(f"Invalid proxy format: {original_proxy_str}")
-
-    host, port_str = host_port.rsplit(":", 1)
-    if not host:
+    host, colon, port_str = host_port.rpartition(":")
+    if not colon or not host:
         raise ValueError(f"Invalid proxy format: {original_proxy_str}")
 
     # Parse authentication and port
-    username, password = _parse_auth(auth_part)
+    username, password = _parse_auth(auth_part if at else None)
     port = _validate_port(port_str)
 
     return ProxyInfo(
@@ -114,57 +162,42 @@ async def start_server(
     proxies: List[ProxyInfo],
     debug: bool,
     auto_optimize: bool,
+    *,
+    state_file: Optional[str] = None,
+    reuse_port: bool = False,
 ) -> None:
     """Start the SOCKS proxy server"""
     # Configure debug logging if enabled
     if debug:
         logging.getLogger().setLevel(logging.DEBUG)
 
-    proxy_manager = ProxyManager(proxies, auto_optimize=auto_optimize)
+    proxy_manager = ProxyManager(
+        proxies, auto_optimize=auto_optimize, state_file=state_file
+    )
     await proxy_manager.start()
     server = SocksServer(proxy_manager)
 
+    last_progress_print = 0.0
+
     def progress_callback(event: str, data: Dict[str, Any]) -> None:
-        if event == "cycle_start":
-            print(
-                f"{Fore.YELLOW}--- Bandwidth/Proxy Optimization Cycle Started ---{Style.RESET_ALL}"
-            )
-        elif event == "user_bandwidth_progress":
-            mb_downloaded = data.get('bytes', 0) // 1024 // 1024
-            print(
-                f"{Fore.CYAN}Testing user bandwidth: {mb_downloaded} MB downloaded..."
-                f"{Style.RESET_ALL}",
-                end="\r",
-            )
-        elif event == "user_bandwidth_done":
-            print(
-                f"{Fore.GREEN}User bandwidth: {data.get('mbps', 0):.2f} Mbps{Style.RESET_ALL}"
-            )
-        elif event == "proxy_bandwidth_progress":
-            proxy = data.get('proxy', '')
-            mb_downloaded = data.get('bytes', 0) // 1024 // 1024
-            print(
-                f"{Fore.CYAN}Testing proxy {proxy}: {mb_downloaded} MB...{Style.RESET_ALL}",
-                end="\r",
-            )
-        elif event == "proxy_bandwidth_done":
-            print(
-                f"{Fore.GREEN}Proxy {data.get('proxy', '')} bandwidth: {data.get('mbps', 0):.2f} Mbps{Style.RESET_ALL}"
-            )
-        elif event == "proxy_bandwidth_avg":
-            print(
-                f"{Fore.GREEN}Average proxy bandwidth: {data.get('mbps', 0):.2f} Mbps{Style.RESET_ALL}"
-            )
-        elif event == "cycle_done":
-            user_mbps = data.get('user_bandwidth_mbps', 0)
-            proxy_avg_mbps = data.get('proxy_avg_bandwidth_mbps', 0)
-            optimal_count = data.get('optimal_proxy_count', 0)
-            total_proxies = data.get('total_proxies', 0)
-            print(
-                f"{Fore.YELLOW}Cycle done. User: {user_mbps:.2f} Mbps, "
-                f"Proxy avg: {proxy_avg_mbps:.2f} Mbps, "
-                f"Optimal proxies: {optimal_count}/{total_proxies}{Style.RESET_ALL}"
-            )
+        nonlocal last_progress_print
+        line = _EVENT_LINES.get(event)
+        if line is not None:
+            print(line % {**_EVENT_DEFAULTS, **data})
+            return
+
+        line = _PROGRESS_LINES.get(event)
+        if line is None:
+            return
+        # Overwrite the current progress line, at most once per PROGRESS_PRINT_INTERVAL
+        now = time.monotonic()
+        if now - last_progress_print < PROGRESS_PRINT_INTERVAL:
+            return
+        last_progress_print = now
+        values = {**_EVENT_DEFAULTS, **data}
+        values["mb"] = values["bytes"] // 1024 // 1024
+        sys.stdout.write(line % values)
+        sys.stdout.flush()
 
     try:
         if auto_optimize:
@@ -174,7 +207,7 @@ async def start_server(
                     progress_callback=progress_callback
                 )
             )
-        await server.start(bind_host, bind_port)
+        await server.start(bind_host, bind_port, reuse_port=reuse_port)
     except asyncio.CancelledError:
         logger.info("Server shutdown initiated")
     except Exception as e:  # pylint: disable=broad-exception-caught
@@ -183,22 +216,101 @@ async def start_server(
         await server.stop()
 
 
+def _run_server(server: Coroutine[Any, Any, None]) -> None:
+    """Run the server coroutine, on uvloop's faster event loop when it is installed"""
+    try:
+        import uvloop  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        asyncio.run(server)
+        return
+    logger.debug("Using uvloop event loop")
+    # Passes uvloop's loop factory to the runner, without the deprecated
+    # global event loop policy
+    uvloop.run(server)
+
+
+def _run_worker(server_args: Tuple[Any, ...], state_file: Optional[str]) -> None:
+    """Run one server process that shares the listening port with its siblings"""
+    try:
+        _run_server(start_server(*server_args, state_file=state_file, reuse_port=True))
+    except KeyboardInterrupt:
+        pass
+
+
+def run_workers(
+    server_args: Tuple[Any, ...], workers: int, state_file: Optional[str] = None
+) -> None:
+    """Run the server in several processes accepting on one SO_REUSEPORT port
+
+    Each worker has its own event loop and proxy manager. Only the first one
+    reads and writes the state file, so the workers never race on it, and only
+    the first one runs auto-optimization, so concurrent bandwidth tests don't
+    saturate the link for each other.
+    """
+    host, port, proxies, debug, _ = server_args
+    follower_args = (host, port, proxies, debug, False)
+    processes = [
+        multiprocessing.Process(
+            target=_run_worker,
+            args=(server_args, state_file) if index == 0 else (follower_args, None),
+            name=f"multisocks-worker-{index}",
+        )
+        for index in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    finally:
+        for process in processes:
+            process.join(WORKER_SHUTDOWN_TIMEOUT)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+
+
+def _validate_workers(workers: int) -> None:
+    """Validate the requested number of server processes"""
+    if workers < 1:
+        raise ValueError("--workers must be at least 1")
+    if workers > 1 and not hasattr(socket, "SO_REUSEPORT"):
+        raise ValueError("--workers requires SO_REUSEPORT, which this platform lacks")
+
+
+def _serve(args: argparse.Namespace, proxies: List[ProxyInfo]) -> None:
+    """Run the server in this process, or in worker processes when requested"""
+    server_args = (args.host, args.port, proxies, args.debug, args.auto_optimize)
+    state_file = args.state_file or None
+    if args.workers > 1:
+        print(f"Running {args.workers} worker processes")
+        run_workers(server_args, args.workers, state_file=state_file)
+        return
+
+    # Run the event loop
+    _run_server(start_server(*server_args, state_file=state_file))
+
+
+def _iter_proxy_lines(lines: Iterable[str]) -> Iterator[str]:
+    """Yield stripped lines, skipping blank lines and comments"""
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith("#"):
+            yield line
+
+
 def read_proxies_from_file(file_path: str) -> List[str]:
     """Read proxy strings from a text file (one per line)"""
     try:
         with open(file_path, "r", encoding="utf-8") as f:
-            # Read lines, strip whitespace, and filter out empty lines and comments
-            return [
-                line.strip()
-                for line in f
-                if line.strip() and not line.strip().startswith("#")
-            ]
+            return list(_iter_proxy_lines(f))
     except Exception as e:
         raise ValueError(f"Failed to read proxies from file {file_path}: {e}") from e
 
 
-def main() -> None:
-    """Main entry point for the CLI application."""
+@functools.lru_cache(maxsize=1)
+def _build_parser() -> argparse.ArgumentParser:
+    """Build the command-line parser once and reuse it for every main() call."""
     parser = argparse.ArgumentParser(
         description="A SOCKS proxy that aggregates multiple remote SOCKS proxies"
     )
@@ -232,6 +344,22 @@ def main() -> None:
         help="Automatically optimize the number of proxies used based on connection speed",
     )
 
+    start_parser.add_argument(
+        "--state-file",
+        default=DEFAULT_STATE_FILE,
+        help="File that keeps proxy latency and bandwidth measurements between runs "
+        "(default: ~/.multisocks/state.json; pass an empty string to disable)",
+    )
+
+    start_parser.add_argument(
+        "--workers",
+        "-w",
+        type=int,
+        default=1,
+        help="Number of server processes sharing the port via SO_REUSEPORT "
+        "(default: 1; not available on Windows)",
+    )
+
     # Create a mutually exclusive group for proxy specification
     proxy_group = start_parser.add_mutually_exclusive_group(required=True)
     proxy_group.add_argument(
@@ -245,7 +373,12 @@ def main() -> None:
         "-f",
         help="Path to a text file containing proxy strings (one per line)",
     )
+    return parser
 
+
+def main() -> None:
+    """Main entry point for the CLI application."""
+    parser = _build_parser()
     args = parser.parse_args()
 
     if args.version:
@@ -270,6 +403,8 @@ def main() -> None:
                     )
                     sys.exit(1)
 
+            _validate_workers(args.workers)
+
             # Parse proxy strings
             proxies = [parse_proxy_string(p) for p in proxy_strings]
 
@@ -293,12 +428,7 @@ def main() -> None:
                     f"  - {Fore.CYAN}... and {len(proxies) - 5} more{Style.RESET_ALL}"
                 )
 
-            # Run the event loop
-            asyncio.run(
-                start_server(
-                    args.host, args.port, proxies, args.debug, args.auto_optimize
-                )
-            )
+            _serve(args, proxies)
         except ValueError as e:
             print(f"{Fore.RED}Error: {e}{Style.RESET_ALL}")
             sys.exit(1)
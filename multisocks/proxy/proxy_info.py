@@ -1,82 +1,311 @@
 """Proxy information class for SOCKS proxy configuration."""
-from dataclasses import dataclass
-from typing import Optional
+import asyncio
+import ipaddress
+import socket
+import time
+from typing import Any, Dict, Optional, Tuple
 
+from python_socks import ProxyType
+from python_socks.async_.asyncio import Proxy
 
-@dataclass
-class ProxyInfo:
+# Per supported protocol: SOCKS version, python_socks proxy type, and whether
+# destination hostnames are resolved by the proxy server (remote DNS)
+PROTOCOL_TABLE: Dict[str, Tuple[int, ProxyType, bool]] = {
+    "socks4": (4, ProxyType.SOCKS4, False),
+    "socks4a": (4, ProxyType.SOCKS4, True),
+    "socks5": (5, ProxyType.SOCKS5, False),
+    "socks5h": (5, ProxyType.SOCKS5, True),
+}
+
+# Unsupported protocols get no version and are otherwise treated as SOCKS5
+_UNSUPPORTED_PROTOCOL: Tuple[Optional[int], ProxyType, bool] = (None, ProxyType.SOCKS5, False)
+
+# SOCKS protocol version spoken by each supported proxy protocol
+PROTOCOL_VERSIONS = {name: entry[0] for name, entry in PROTOCOL_TABLE.items()}
+
+SUPPORTED_PROTOCOLS = frozenset(PROTOCOL_TABLE)
+
+
+class ProxyInfo:  # pylint: disable=too-many-instance-attributes
     """Class representing a SOCKS proxy configuration"""
 
-    protocol: str  # socks4, socks4a, socks5, or socks5h
-    host: str
-    port: int
-    username: Optional[str] = None
-    password: Optional[str] = None
-    weight: int = 1
+    # Slots instead of a per-instance __dict__, since large proxy lists
+    # keep thousands of these alive for the lifetime of the server
+    __slots__ = (
+        # Identity fields, read-only through the properties below since the
+        # string forms, connector options and hash are derived from them
+        "_protocol",  # socks4, socks4a, socks5, or socks5h
+        "_host",
+        "_port",
+        "_username",
+        "_password",
+        "_weight",
+        # For tracking proxy health
+        "_alive",
+        "fail_count",
+        "latency_us",
+        "next_check_at",  # time.monotonic() before which a dead proxy isn't re-checked
+        "active_connections",  # Client connections currently dispatched through it
+        # Addresses of the proxy host, refreshed after DNS_TTL seconds, and
+        # the one of them a connection last succeeded through
+        "resolved_host",
+        "_addresses",
+        "_resolved_at",
+        "_resolved_conn_str",
+        # Derived values cached at construction
+        "_str",
+        "_conn_str",
+        "protocol_version",
+        "socks_options",
+        # python_socks connector reused while the address and event loop stay the same
+        "_connector",
+        "_connector_key",
+        "_key",
+        "_hash",
+    )
+
+    # Weight given to the newest sample in the latency EWMA, in tenths
+    LATENCY_EWMA_NEW = 3
+
+    # Seconds resolved proxy addresses are reused before they are looked up again
+    DNS_TTL = 300
+
+    # Consecutive failures after which a proxy is considered dead
+    MAX_FAILURES = 3
+
+    # Seconds a dead proxy waits before its next health check, doubling with
+    # every further failure up to RECHECK_BACKOFF_MAX
+    RECHECK_BACKOFF_BASE = 30
+    RECHECK_BACKOFF_MAX = 3600
+
+    # Bumped whenever any proxy changes between alive and dead, so callers
+    # can cache views over the healthy proxies until the next change
+    health_epoch = 0
+
+    def __init__(  # pylint: disable=too-many-positional-arguments
+        self,
+        protocol: str,
+        host: str,
+        port: int,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        weight: int = 1,
+        alive: bool = True,
+        fail_count: int = 0,
+        latency: float = 0.0,
+    ) -> None:
+        """Store the proxy settings and precompute the string forms, protocol version and hash"""
+        self._protocol = protocol
+        self._host = host
+        self._port = port
+        self._username = username
+        self._password = password
+        self._weight = weight
+        self._alive = alive
+        self.fail_count = fail_count
+        self.latency_us = round(latency * 1_000_000)
+        self.next_check_at = 0.0
+        self.active_connections = 0
+        self.resolved_host: Optional[str] = None
+        self._addresses: Tuple[str, ...] = ()
+        self._resolved_at = 0.0
+        self._resolved_conn_str: Optional[str] = None
+
+        auth = f"{username}:{password}@" if username else ""
+        weight_str = f"/{weight}" if weight != 1 else ""
+        self._conn_str = f"{protocol}://{auth}{host}:{port}"
+        self._str = f"{self._conn_str}{weight_str}"
+        # One table lookup classifies the protocol; None version if unsupported
+        version, proxy_type, rdns = PROTOCOL_TABLE.get(protocol, _UNSUPPORTED_PROTOCOL)
+        self.protocol_version: Optional[int] = version
+        # Keyword arguments for python_socks' Proxy, all but the host, which
+        # changes as the proxy address is re-resolved
+        self.socks_options: Dict[str, Any] = {
+            "proxy_type": proxy_type,
+            "port": port,
+            "username": username,
+            "password": password,
+            "rdns": rdns,
+        }
+        self._connector: Optional[Proxy] = None
+        self._connector_key: Optional[Tuple[str, asyncio.AbstractEventLoop]] = None
+        self._key = (protocol, host, port, username, password, weight)
+        self._hash = hash(self._key)
+
+    def __repr__(self) -> str:
+        return (
+            f"ProxyInfo(protocol={self.protocol!r}, host={self.host!r}, "
+            f"port={self.port!r}, username={self.username!r}, "
+            f"password={self.password!r}, weight={self.weight!r}, "
+            f"alive={self.alive!r}, fail_count={self.fail_count!r}, "
+            f"latency={self.latency!r})"
+        )
+
+    @property
+    def protocol(self) -> str:
+        """Proxy protocol: socks4, socks4a, socks5, or socks5h"""
+        return self._protocol
+
+    @property
+    def host(self) -> str:
+        """Proxy hostname or address as configured"""
+        return self._host
+
+    @property
+    def port(self) -> int:
+        """Proxy port"""
+        return self._port
+
+    @property
+    def username(self) -> Optional[str]:
+        """Username for proxy authentication, if any"""
+        return self._username
 
-    # For tracking proxy health
-    alive: bool = True
-    fail_count: int = 0
-    latency: float = 0.0
+    @property
+    def password(self) -> Optional[str]:
+        """Password for proxy authentication, if any"""
+        return self._password
+
+    @property
+    def weight(self) -> int:
+        """Relative share of connections dispatched through this proxy"""
+        return self._weight
+
+    @property
+    def alive(self) -> bool:
+        """Whether the proxy is currently considered healthy"""
+        return self._alive
+
+    @alive.setter
+    def alive(self, value: bool) -> None:
+        if value != self._alive:
+            self._alive = value
+            ProxyInfo.health_epoch += 1
+
+    @property
+    def latency(self) -> float:
+        """Smoothed latency in seconds"""
+        return self.latency_us / 1_000_000
+
+    @latency.setter
+    def latency(self, seconds: float) -> None:
+        self.latency_us = round(seconds * 1_000_000)
 
     def __str__(self) -> str:
         """String representation of the proxy for display"""
-        auth = f"{self.username}:{self.password}@" if self.username else ""
-        weight_str = f"/{self.weight}" if self.weight != 1 else ""
-        return f"{self.protocol}://{auth}{self.host}:{self.port}{weight_str}"
+        return self._str
 
     def connection_string(self) -> str:
         """Get the connection string without the weight"""
+        return self._conn_str
+
+    def resolved_connection_string(self) -> str:
+        """Get the connection string with the proxy host replaced by its cached address"""
+        return self._resolved_conn_str or self._conn_str
+
+    @property
+    def connect_host(self) -> str:
+        """Address to dial for this proxy: the pinned address, else the hostname"""
+        return self.resolved_host or self.host
+
+    def get_connector(self, host: Optional[str] = None) -> Proxy:
+        """Get the python_socks connector for this proxy, built once per address and loop
+
+        A connector holds no per-connection state, so one instance serves
+        every health check and dispatch through this proxy. host overrides
+        connect_host, e.g. to try another of the resolved addresses.
+        """
+        key = (host or self.connect_host, asyncio.get_running_loop())
+        if self._connector is None or self._connector_key != key:
+            self._connector = Proxy(host=key[0], **self.socks_options)
+            self._connector_key = key
+        return self._connector
+
+    async def resolve(self) -> Tuple[str, ...]:
+        """Look up the proxy host's addresses, reusing them for DNS_TTL seconds
+
+        The pinned address comes first while it is still listed. Lookup
+        failures keep the previous addresses (or the hostname), so the
+        subsequent connection attempt reports the actual error.
+        """
+        loop = asyncio.get_running_loop()
+        if self._addresses and loop.time() - self._resolved_at < self.DNS_TTL:
+            return self._addresses
+        try:
+            ipaddress.ip_address(self.host)
+            return (self.host,)  # Already a literal address
+        except ValueError:
+            pass
+        try:
+            infos = await loop.getaddrinfo(self.host, self.port, type=socket.SOCK_STREAM)
+        except OSError:
+            infos = []
+        if not infos:
+            return self._addresses or (self.connect_host,)
+
+        addresses = tuple(dict.fromkeys(str(info[4][0]) for info in infos))
+        if self.resolved_host in addresses:
+            addresses = (self.resolved_host,) + tuple(a for a in addresses if a != self.resolved_host)
+        self._addresses = addresses
+        self._resolved_at = loop.time()
+        return addresses
+
+    def pin_address(self, address: str) -> None:
+        """Dial address for this proxy from now on, once a connection through it succeeded"""
+        if address == self.host:
+            self.resolved_host = None
+            self._resolved_conn_str = None
+            return
+        url_host = f"[{address}]" if ":" in address else address
         auth = f"{self.username}:{self.password}@" if self.username else ""
-        return f"{self.protocol}://{auth}{self.host}:{self.port}"
+        self.resolved_host = address
+        self._resolved_conn_str = f"{self.protocol}://{auth}{url_host}:{self.port}"
 
     def get_protocol_version(self) -> int:
         """Get the SOCKS protocol version as an integer"""
-        if self.protocol.startswith("socks4"):
-            return 4
-        if self.protocol in ("socks5", "socks5h"):
-            return 5
-        raise ValueError(f"Unsupported protocol: {self.protocol}")
+        if self.protocol_version is None:
+            raise ValueError(f"Unsupported protocol: {self.protocol}")
+        return self.protocol_version
 
     def mark_failed(self) -> None:
         """Mark the proxy as having failed a connection attempt"""
         self.fail_count += 1
-        if self.fail_count >= 3:  # Consider a proxy dead after 3 failures
+        if self.fail_count >= self.MAX_FAILURES:
             self.alive = False
+            backoff = self.RECHECK_BACKOFF_BASE << min(self.fail_count - self.MAX_FAILURES, 16)
+            self.next_check_at = time.monotonic() + min(backoff, self.RECHECK_BACKOFF_MAX)
 
     def mark_successful(self) -> None:
         """Reset failure counter after a successful connection"""
         self.fail_count = 0
+        self.next_check_at = 0.0
         self.alive = True
 
     def update_latency(self, latency: float) -> None:
         """Update the proxy's latency (in seconds)"""
-        # Simple smoothing to avoid drastic changes
-        if self.latency == 0.0:
-            self.latency = latency
+        sample_us = round(latency * 1_000_000)
+        # Integer EWMA to smooth out drastic changes
+        if self.latency_us == 0:
+            self.latency_us = sample_us
         else:
-            self.latency = (self.latency * 0.7) + (latency * 0.3)
+            self.latency_us = (
+                self.latency_us * (10 - self.LATENCY_EWMA_NEW)
+                + sample_us * self.LATENCY_EWMA_NEW
+            ) // 10
+
+    def __reduce__(self) -> Tuple[Any, Tuple[Any, ...]]:
+        """Pickle through __init__ so the hash and cached values are rebuilt
+
+        str hashes are salted per process, so a _hash copied into a worker
+        process would not match equal proxies built there.
+        """
+        return (ProxyInfo, (
+            self.protocol, self.host, self.port, self.username, self.password,
+            self.weight, self._alive, self.fail_count, self.latency,
+        ))
 
     def __eq__(self, other: object) -> bool:
-        if not isinstance(other, ProxyInfo):
-            return False
-        return (
-            self.protocol == other.protocol
-            and self.host == other.host
-            and self.port == other.port
-            and self.username == other.username
-            and self.password == other.password
-            and self.weight == other.weight
-        )
+        return isinstance(other, ProxyInfo) and self._key == other._key
 
     def __hash__(self) -> int:
-        return hash(
-            (
-                self.protocol,
-                self.host,
-                self.port,
-                self.username,
-                self.password,
-                self.weight,
-            )
-        )
+        return self._hash
@@ -1,13 +1,14 @@
 """Proxy management and health checking for SOCKS proxies."""
 import asyncio
+import heapq
+import json
 import logging
+import os
 import random
 import socket
 import time
-from typing import Any, Callable, Dict, List, Optional, TYPE_CHECKING
-
-from python_socks.async_.asyncio import Proxy
-from python_socks import ProxyType
+from operator import attrgetter
+from typing import Any, Callable, Dict, List, Optional, Tuple, TYPE_CHECKING
 
 from .proxy_info import ProxyInfo
 
@@ -23,15 +24,70 @@ else:
 logger = logging.getLogger(__name__)
 
 
-class ProxyManager:
+def _build_alias_table(weights: List[int]) -> Tuple[List[int], List[int]]:
+    """Build Vose alias tables for O(1) weighted sampling with integer weights
+
+    Each of the n columns holds sum(weights) units: column i yields index i
+    for the first prob[i] units and alias[i] for the rest. Weights are scaled
+    by n so the construction stays exact in integers.
+    """
+    n = len(weights)
+    total = sum(weights)
+    scaled = [w * n for w in weights]
+    prob = [total] * n
+    alias = list(range(n))
+    small = [i for i, w in enumerate(scaled) if w < total]
+    large = [i for i, w in enumerate(scaled) if w >= total]
+    while small and large:
+        less = small.pop()
+        more = large.pop()
+        prob[less] = scaled[less]
+        alias[less] = more
+        scaled[more] -= total - scaled[less]
+        (small if scaled[more] < total else large).append(more)
+    return prob, alias
+
+
+class ProxyManager:  # pylint: disable=too-many-instance-attributes
     """Manages multiple SOCKS proxies, handling dispatch and health monitoring"""
 
-    def __init__(self, proxies: List[ProxyInfo], auto_optimize: bool = False):
+    # Maximum number of proxy health checks in flight at once
+    HEALTH_CHECK_CONCURRENCY = 50
+
+    # Seconds a single health check (DNS refresh plus connect) may take
+    HEALTH_CHECK_TIMEOUT = 6.0
+
+    # Seconds for the rolling health check to visit every proxy once
+    HEALTH_CHECK_INTERVAL = 30
+
+    # Seconds between health check batches; each batch is an equal share
+    # of the proxies, so the checks are spread evenly over the interval
+    HEALTH_CHECK_STEP = 1.0
+
+    # Client connections through one proxy beyond which dispatch moves to
+    # the least-loaded candidate instead
+    MAX_CONNECTIONS_PER_PROXY = 256
+
+    # Every Nth health check round runs the full SOCKS handshake for every
+    # proxy; rounds in between only open a TCP connection to live proxies
+    DEEP_CHECK_INTERVAL = 5
+
+    # Seconds a saved measurement state stays valid for seeding a new run
+    STATE_MAX_AGE = 86400
+
+    def __init__(
+        self,
+        proxies: List[ProxyInfo],
+        auto_optimize: bool = False,
+        state_file: Optional[str] = None,
+    ):
         """Initialize with a list of proxies
 
         Args:
             proxies: List of ProxyInfo objects representing available proxies
             auto_optimize: Whether to automatically optimize proxy usage based on bandwidth
+            state_file: JSON file that latency and bandwidth measurements are
+                saved to on stop and restored from on start
         """
         if not proxies:
             raise ValueError("At least one proxy must be provided")
@@ -39,9 +95,25 @@ class ProxyManager:
         self.all_proxies = proxies  # All available proxies
         self.active_proxies = list(proxies)  # Currently active proxies
         self._index = 0
-        self._total_weight = sum(p.weight for p in proxies)
-        self._lock = asyncio.Lock()
+        # Private generator for proxy selection, independent of the shared module RNG
+        self._rng = random.Random()
         self.auto_optimize = auto_optimize
+        self.state_file = state_file
+        self._health_check_semaphore = asyncio.Semaphore(self.HEALTH_CHECK_CONCURRENCY)
+        self._health_check_round = 0
+        self._health_check_cursor = 0
+
+        # Selection table for get_proxy: the candidate proxies and their alias
+        # tables, rebuilt only when health or the proxy lists change
+        self._selection_key: Tuple[int, ...] = ()
+        self._selection_sources: Tuple[List[ProxyInfo], ...] = ()
+        self._candidates: Tuple[ProxyInfo, ...] = ()
+        self._candidate_weight = 0
+        self._uniform_weights = False
+        # (prob, alias, number of draw units across all alias columns)
+        self._alias_table: Tuple[List[int], List[int], int] = ([], [], 0)
+        # Healthy subset of all_proxies as (health epoch, source list, its length, healthy list)
+        self._healthy_cache: Tuple[int, List[ProxyInfo], int, List[ProxyInfo]] = (-1, [], 0, [])
 
         # For bandwidth optimization
         self.bandwidth_tester: Optional['BandwidthTester'] = None
@@ -61,7 +133,7 @@ class ProxyManager:
         self._health_check_task: Optional[asyncio.Task[None]] = None
 
     async def stop(self) -> None:
-        """Stop the health check task"""
+        """Stop the health check task and release bandwidth test sessions"""
         if hasattr(self, "_health_check_task") and self._health_check_task is not None:
             self._health_check_task.cancel()
             try:
@@ -69,59 +141,175 @@ class ProxyManager:
             except asyncio.CancelledError:
                 pass
 
-    async def get_proxy(self, target_host: str, target_port: int) -> ProxyInfo:
-        """Get the next available proxy using weighted round-robin"""
-        async with self._lock:
-            # First try to select from only healthy active proxies
-            healthy_proxies = [p for p in self.active_proxies if p.alive]
+        if self.bandwidth_tester is not None:
+            await self.bandwidth_tester.close()
+
+        self._save_state()
+
+    @staticmethod
+    def _state_key(proxy: ProxyInfo) -> str:
+        """Key a proxy in the state file by endpoint, leaving credentials out"""
+        return f"{proxy.protocol}://{proxy.host}:{proxy.port}"
+
+    def _save_state(self) -> None:
+        """Write latency and bandwidth measurements to the state file, if any"""
+        if not self.state_file:
+            return
+        state: Dict[str, Any] = {
+            "saved_at": time.time(),
+            "latency": {
+                self._state_key(p): p.latency for p in self.all_proxies if p.latency_us
+            },
+        }
+        if self.bandwidth_tester is not None:
+            state["user_bandwidth_mbps"] = self.bandwidth_tester.user_bandwidth_mbps
+            state["proxy_avg_bandwidth_mbps"] = self.bandwidth_tester.proxy_avg_bandwidth_mbps
+        try:
+            directory = os.path.dirname(self.state_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.state_file, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+        except OSError as e:
+            logger.warning("Could not save state to %s: %s", self.state_file, e)
+
+    def _load_state(self) -> None:
+        """Seed latencies and bandwidth from a recent state file, if any
+
+        Restored bandwidth also counts as the last optimization, so the
+        next bandwidth measurement waits out the optimization interval.
+        """
+        if not self.state_file or not os.path.exists(self.state_file):
+            return
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            saved_at = float(state["saved_at"])
+            if time.time() - saved_at >= self.STATE_MAX_AGE:
+                return
+            latencies = {
+                key: float(value) for key, value in state.get("latency", {}).items()
+            }
+            user_bandwidth = float(state.get("user_bandwidth_mbps", 0.0))
+            proxy_bandwidth = float(state.get("proxy_avg_bandwidth_mbps", 0.0))
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            logger.warning("Ignoring unreadable state file %s: %s", self.state_file, e)
+            return
 
-            # If no healthy proxies in active set, try all healthy proxies
-            if not healthy_proxies:
-                logger.warning("No healthy proxies in active set, checking all proxies")
-                healthy_proxies = [p for p in self.all_proxies if p.alive]
+        for proxy in self.all_proxies:
+            latency = latencies.get(self._state_key(proxy))
+            if latency is not None and not proxy.latency_us:
+                proxy.latency = latency
+        if self.bandwidth_tester is not None and user_bandwidth > 0:
+            self.bandwidth_tester.user_bandwidth_mbps = user_bandwidth
+            self.bandwidth_tester.proxy_avg_bandwidth_mbps = proxy_bandwidth
+            self.last_optimization_time = saved_at
+        logger.info("Restored measurements from %s", self.state_file)
+
+    def healthy_proxies(self) -> List[ProxyInfo]:
+        """Healthy proxies among all_proxies, rescanned only after a health change
+
+        The returned list is shared between calls and must not be modified.
+        """
+        epoch, source, size, healthy = self._healthy_cache
+        if (
+            epoch != ProxyInfo.health_epoch
+            or source is not self.all_proxies
+            or size != len(source)
+        ):
+            source = self.all_proxies
+            healthy = [p for p in source if p.alive]
+            self._healthy_cache = (ProxyInfo.health_epoch, source, len(source), healthy)
+        return healthy
+
+    def _refresh_selection(self) -> None:
+        """Rebuild the candidate proxies and cumulative weights if anything changed"""
+        key = (
+            ProxyInfo.health_epoch,
+            id(self.active_proxies),
+            len(self.active_proxies),
+            id(self.all_proxies),
+            len(self.all_proxies),
+        )
+        if key == self._selection_key:
+            return
 
-            # If still no healthy proxies, try to use any active proxy
-            if not healthy_proxies:
-                logger.warning(
-                    "No healthy proxies available, trying to use any active proxy"
-                )
-                healthy_proxies = self.active_proxies
+        # First try to select from only healthy active proxies
+        candidates = [p for p in self.active_proxies if p.alive]
 
-            # Last resort: try any proxy
-            if not healthy_proxies:
-                logger.warning("No active proxies available, trying any proxy")
-                healthy_proxies = self.all_proxies
+        # If no healthy proxies in active set, try all healthy proxies
+        if not candidates:
+            logger.warning("No healthy proxies in active set, checking all proxies")
+            candidates = list(self.healthy_proxies())
 
-            if not healthy_proxies:
-                raise RuntimeError("No proxies available")
-
-            # Simple weighted round-robin selection
-            total_weight = sum(p.weight for p in healthy_proxies)
-            if total_weight == 0:
-                # If all weights are 0, use equal weights
-                selected = healthy_proxies[self._index % len(healthy_proxies)]
-                self._index = (self._index + 1) % len(healthy_proxies)
-            else:
-                # Weighted selection
-                r = random.randint(1, total_weight)
-                for proxy in healthy_proxies:
-                    r -= proxy.weight
-                    if r <= 0:
-                        selected = proxy
-                        break
-                else:
-                    # Fallback if something went wrong with the weighting
-                    selected = random.choice(healthy_proxies)
+        # If still no healthy proxies, try to use any active proxy
+        if not candidates:
+            logger.warning(
+                "No healthy proxies available, trying to use any active proxy"
+            )
+            candidates = list(self.active_proxies)
+
+        # Last resort: try any proxy
+        if not candidates:
+            logger.warning("No active proxies available, trying any proxy")
+            candidates = list(self.all_proxies)
+
+        if not candidates:
+            raise RuntimeError("No proxies available")
+
+        self._candidates = tuple(candidates)
+        weights = [p.weight for p in candidates]
+        self._candidate_weight = sum(weights)
+        self._uniform_weights = min(weights) == max(weights)
+        if self._candidate_weight:
+            prob, alias = _build_alias_table(weights)
+            self._alias_table = (prob, alias, len(weights) * self._candidate_weight)
+        self._selection_key = key
+        # Keep the source lists alive so their ids can't be reused by new lists
+        self._selection_sources = (self.active_proxies, self.all_proxies)
+
+    async def get_proxy(self, target_host: str, target_port: int) -> ProxyInfo:
+        """Get the next available proxy
 
+        Proxies with differing weights are drawn in proportion to their weight;
+        equally weighted proxies are taken round-robin, preferring the next
+        one when it is less loaded. Selection never awaits, so it runs
+        atomically with respect to other coroutines on the loop and needs no lock.
+        """
+        self._refresh_selection()
+        candidates = self._candidates
+
+        if self._uniform_weights:
+            # Equal (or all-zero) weights: round-robin, stepping past the pick
+            # when the next proxy has fewer active connections
+            index = self._index % len(candidates)
+            self._index = (index + 1) % len(candidates)
+            selected = candidates[index]
+            following = candidates[self._index]
+            if following.active_connections < selected.active_connections:
+                selected = following
+        else:
+            # Weighted selection: one draw picks an alias column and a unit in it
+            prob, alias, draw_range = self._alias_table
+            column, unit = divmod(self._rng.randrange(draw_range), self._candidate_weight)
+            if unit >= prob[column]:
+                column = alias[column]
+            selected = candidates[column]
+
+        if selected.active_connections >= self.MAX_CONNECTIONS_PER_PROXY:
+            selected = min(candidates, key=attrgetter("active_connections"))
+
+        # Skip the logging call entirely on this per-request path unless debugging
+        if logger.isEnabledFor(logging.DEBUG):
             logger.debug("Selected proxy %s for %s:%d", selected, target_host, target_port)
-            return selected
+        return selected
 
     async def _health_check_loop(self) -> None:
-        """Periodically check the health of all proxies and optimize if needed"""
+        """Check the proxies in rolling batches and optimize if needed"""
         while True:
             try:
-                await asyncio.sleep(30)  # Check every 30 seconds
-                await self._check_all_proxies()
+                await asyncio.sleep(self.HEALTH_CHECK_STEP)
+                await self._check_all_proxies(self._next_health_batch())
 
                 # Optimize proxy usage if auto-optimize is enabled
                 if self.auto_optimize and self.bandwidth_tester:
@@ -137,27 +325,80 @@ class ProxyManager:
             except Exception as e:  # pylint: disable=broad-exception-caught
                 logger.error("Error in health check loop: %s", e)
 
-    async def _check_all_proxies(self) -> None:
-        """Check the health of all proxies"""
-        tasks = []
-        for proxy in self.all_proxies:
-            tasks.append(self._check_proxy(proxy))
+    async def _check_proxy_limited(self, proxy: ProxyInfo, deep: bool) -> bool:
+        """Check a proxy within the concurrency limit and overall time budget
 
-        # Run health checks concurrently
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        Dead proxies always get the full check, so only a working SOCKS
+        handshake can bring them back.
+        """
+        check = self._check_proxy if deep or not proxy.alive else self._ping_proxy
+        async with self._health_check_semaphore:
+            return await asyncio.wait_for(check(proxy), timeout=self.HEALTH_CHECK_TIMEOUT)
 
-        # Update proxy statuses
-        alive_count = 0
-        for i, proxy in enumerate(self.all_proxies):
-            if isinstance(results[i], Exception):
-                logger.debug("Health check for %s failed: %s", proxy, results[i])
-                proxy.mark_failed()
-            else:
-                alive_count += 1
+    def _next_health_batch(self) -> List[ProxyInfo]:
+        """Take the next round-robin share of the proxies for the rolling health check
 
-        logger.info(
-            "Health check completed: %d/%d proxies alive", alive_count, len(self.all_proxies)
-        )
+        Each call advances a cursor through all_proxies; a new round starts
+        whenever the cursor wraps back to the first proxy.
+        """
+        proxies = self.all_proxies
+        if not proxies:
+            return []
+        if self._health_check_cursor == 0:
+            if self._health_check_round:
+                logger.info(
+                    "Health check round completed: %d/%d proxies alive",
+                    len(self.healthy_proxies()), len(proxies),
+                )
+            self._health_check_round += 1
+
+        steps = max(1, round(self.HEALTH_CHECK_INTERVAL / self.HEALTH_CHECK_STEP))
+        size = -(-len(proxies) // steps)
+        start = min(self._health_check_cursor, len(proxies))
+        end = min(start + size, len(proxies))
+        self._health_check_cursor = end % len(proxies)
+        return proxies[start:end]
+
+    async def _check_all_proxies(self, proxies: Optional[List[ProxyInfo]] = None) -> None:
+        """Check the health of the given proxies (default: all of them) as one batch
+
+        Each result is handled as soon as it arrives. Called without a batch,
+        this is a full round of its own.
+        """
+        full_round = proxies is None
+        if proxies is None:
+            proxies = self.all_proxies
+            self._health_check_round += 1
+        deep = (self._health_check_round - 1) % self.DEEP_CHECK_INTERVAL == 0
+        # Dead proxies still backing off are skipped until they are due again
+        now = time.monotonic()
+        tasks = {
+            asyncio.ensure_future(self._check_proxy_limited(proxy, deep)): proxy
+            for proxy in proxies
+            if proxy.next_check_at <= now
+        }
+        pending = set(tasks)
+        alive_count = 0
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    proxy = tasks[task]
+                    error = task.exception()
+                    if error is not None:
+                        logger.debug("Health check for %s failed: %s", proxy, error)
+                        proxy.mark_failed()
+                    elif task.result():
+                        alive_count += 1
+        finally:
+            for task in pending:
+                task.cancel()
+
+        # Rolling batches are summarized once per round by _next_health_batch
+        log = logger.info if full_round else logger.debug
+        log("Health check completed: %d/%d proxies alive", alive_count, len(proxies))
 
     async def _optimize_proxy_usage(self) -> None:
         """Dynamically adjust which proxies are active based on bandwidth needs"""
@@ -175,7 +416,7 @@ class ProxyManager:
                 return
 
             # Measure average proxy speed using a sample of proxies
-            healthy_proxies = [p for p in self.all_proxies if p.alive]
+            healthy_proxies = self.healthy_proxies()
             if not healthy_proxies:
                 logger.warning("No healthy proxies available for optimization")
                 return
@@ -187,9 +428,10 @@ class ProxyManager:
                 healthy_proxies
             )
 
-            # Select best proxies based on latency
-            sorted_proxies = sorted(healthy_proxies, key=lambda p: p.latency)
-            self.active_proxies = sorted_proxies[:optimal_count]
+            # Select the lowest-latency proxies with a partial heap selection
+            self.active_proxies = heapq.nsmallest(
+                optimal_count, healthy_proxies, key=attrgetter("latency_us")
+            )
 
             logger.info(
                 "Optimized to use %d proxies out of %d healthy proxies", 
@@ -198,45 +440,76 @@ class ProxyManager:
         except Exception as e:  # pylint: disable=broad-exception-caught
             logger.error("Error optimizing proxy usage: %s", e)
             # Fallback to using all healthy proxies
-            self.active_proxies = [p for p in self.all_proxies if p.alive]
+            self.active_proxies = list(self.healthy_proxies())
 
-    async def _check_proxy(self, proxy: ProxyInfo) -> bool:
-        """Check if a proxy is alive by connecting to a known host"""
+    async def _ping_proxy(self, proxy: ProxyInfo) -> bool:
+        """Cheap liveness check: open and close a plain TCP connection to the proxy
+
+        A successful ping leaves the failure count alone, since only a full
+        SOCKS handshake in _check_proxy shows the proxy actually works.
+        """
+        try:
+            _, writer = await asyncio.wait_for(
+                asyncio.open_connection(proxy.connect_host, proxy.port), timeout=5
+            )
+            writer.close()
+        except (asyncio.TimeoutError, OSError) as e:
+            logger.debug("Proxy %s ping failed: %s", proxy, e)
+            proxy.mark_failed()
+            return False
+        return True
+
+    async def _probe_address(self, proxy: ProxyInfo, address: str, timeout: float) -> float:
+        """Connect through the proxy at one of its addresses and return the latency"""
         test_host = "1.1.1.1"  # Cloudflare DNS as a reliable test target
         test_port = 53  # DNS port
 
-        # Map protocol to proxy type
-        proxy_type = ProxyType.SOCKS4 if proxy.protocol.startswith("socks4") else ProxyType.SOCKS5
+        proxy_connector = proxy.get_connector(address)
 
-        # Determine if remote DNS resolution should be used
-        # For SOCKS4a and SOCKS5h, DNS resolution should happen on the proxy server
-        rdns = proxy.protocol in ("socks4a", "socks5h")
+        start_time = time.perf_counter()
 
-        try:
-            # Create a proxy connector
-            proxy_connector = Proxy(
-                proxy_type=proxy_type,
-                host=proxy.host,
-                port=proxy.port,
-                username=proxy.username,
-                password=proxy.password,
-                rdns=rdns,
-            )
+        # Try to connect through the proxy
+        stream = await asyncio.wait_for(
+            proxy_connector.connect(dest_host=test_host, dest_port=test_port),
+            timeout=timeout,
+        )
 
-            start_time = time.time()
+        # Measure latency
+        latency = time.perf_counter() - start_time
 
-            # Try to connect through the proxy
-            stream = await asyncio.wait_for(
-                proxy_connector.connect(dest_host=test_host, dest_port=test_port),
-                timeout=5,  # 5 second timeout
+        # Close the connection
+        stream.close()
+        return latency
+
+    async def _check_proxy(self, proxy: ProxyInfo) -> bool:
+        """Check if a proxy is alive by connecting to a known host"""
+        loop = asyncio.get_running_loop()
+        # The whole check, every address included, fits in HEALTH_CHECK_TIMEOUT
+        deadline = loop.time() + self.HEALTH_CHECK_TIMEOUT
+        try:
+            # Refresh the proxy's addresses so connections skip the DNS lookup
+            addresses = await asyncio.wait_for(
+                proxy.resolve(), timeout=min(5, self.HEALTH_CHECK_TIMEOUT)
             )
 
-            # Measure latency
-            latency = time.time() - start_time
-            proxy.update_latency(latency)
+            # Try each address in turn, since the first one listed may not be
+            # routable from here (e.g. IPv6 on an IPv4-only host). Each attempt
+            # gets an equal share of the time left, so a hanging address can't
+            # use up the time the others need.
+            for index, address in enumerate(addresses[:-1]):
+                share = (deadline - loop.time()) / (len(addresses) - index)
+                try:
+                    latency = await self._probe_address(proxy, address, share)
+                    break
+                except (asyncio.TimeoutError, socket.error):
+                    continue
+            else:
+                address = addresses[-1]
+                latency = await self._probe_address(proxy, address, deadline - loop.time())
 
-            # Close the connection
-            stream.close()
+            # Later connections and checks dial the address that worked
+            proxy.pin_address(address)
+            proxy.update_latency(latency)
 
             # Mark proxy as successful
             proxy.mark_successful()
@@ -255,6 +528,7 @@ class ProxyManager:
     async def start(self) -> None:
         """Start the health check task. Must be called from an async context."""
         if self._health_check_task is None:
+            self._load_state()
             self._health_check_task = asyncio.create_task(self._health_check_loop())
 
     async def start_continuous_optimization(
@@ -2,14 +2,13 @@
 
 import asyncio
 import logging
+import os
 import socket
 import struct
+import sys
 import time
 from typing import Any, Optional, Tuple
 
-from python_socks.async_.asyncio import Proxy
-from python_socks import ProxyType
-
 from .proxy_manager import ProxyManager
 
 # pylint: disable=broad-exception-caught
@@ -47,10 +46,145 @@ SOCKS5_RESP_TTL_EXPIRED = 0x06
 SOCKS5_RESP_COMMAND_NOT_SUPPORTED = 0x07
 SOCKS5_RESP_ADDRESS_TYPE_NOT_SUPPORTED = 0x08
 
+# Precompiled wire layouts for the handshake messages
+_SOCKS5_REQUEST_HEADER = struct.Struct("!BBBB")  # version, command, reserved, address type
+_SOCKS5_REPLY = struct.Struct("!BBBBIH")  # version, reply, reserved, IPv4 type, address, port
+_SOCKS4_REQUEST = struct.Struct("!BH4s")  # command, port, IPv4 address (after the version byte)
+_SOCKS4_REPLY = struct.Struct("!BBH4s")  # null byte, reply, port, IPv4 address
+_SOCKS5_IPV4_ADDRESS = struct.Struct("!4sH")  # IPv4 address, port
+_SOCKS5_IPV6_ADDRESS = struct.Struct("!16sH")  # IPv6 address, port
+_PORT = struct.Struct("!H")
+
+# Unspecified bind address returned in SOCKS4 replies
+_SOCKS4_ZERO_BIND = b"\0\0\0\0"
+
+# SOCKS5 method-selection replies, built once
+_SOCKS5_METHOD_REPLIES = {
+    method: bytes((SOCKS_VERSION_5, method))
+    for method in (SOCKS5_AUTH_NONE, SOCKS5_AUTH_NO_ACCEPTABLE_METHODS)
+}
+
+# SOCKS5 command replies (bound to 0.0.0.0:0) for every standard response code, built once
+_SOCKS5_REPLIES = {
+    code: _SOCKS5_REPLY.pack(SOCKS_VERSION_5, code, 0, SOCKS5_ATYP_IPV4, 0, 0)
+    for code in range(SOCKS5_RESP_SUCCESS, SOCKS5_RESP_ADDRESS_TYPE_NOT_SUPPORTED + 1)
+}
+
 # SOCKS4 response codes
 SOCKS4_RESP_SUCCESS = 0x5A
 SOCKS4_RESP_REJECTED = 0x5B
 
+# Longest SOCKS4 user ID or SOCKS4A hostname accepted, excluding the NUL
+SOCKS4_MAX_FIELD_LENGTH = 255
+
+# Seconds allowed for connecting to a destination through a proxy
+PROXY_CONNECT_TIMEOUT = 10
+
+# Listen backlog used when the kernel's accept-queue limit can't be read
+DEFAULT_LISTEN_BACKLOG = 4096
+
+# Size of the reusable receive buffer owned by each relay direction
+RELAY_BUFFER_SIZE = 65536
+
+# Bytes moved per splice(2) call; matches the default pipe capacity on Linux
+SPLICE_CHUNK_SIZE = 65536
+
+# Largest chunk the streamed pipe takes from its reader per write
+PIPE_READ_SIZE = 262144
+
+# Write-buffer high-water mark for relayed connections
+PIPE_WRITE_HIGH_WATER = 1 << 20
+
+
+class _RelayProtocol(asyncio.BufferedProtocol):
+    """Receive into a reusable buffer and write straight to the peer transport"""
+
+    def __init__(
+        self,
+        peer: asyncio.Transport,
+        stream_protocol: asyncio.BaseProtocol,
+        closed: "asyncio.Future[None]",
+    ) -> None:
+        self._peer = peer
+        # The stream protocol this one replaced; told about connection loss so the
+        # StreamWriter's wait_closed() still completes
+        self._stream_protocol = stream_protocol
+        self._closed = closed
+        self._view = memoryview(bytearray(RELAY_BUFFER_SIZE))
+        # Second receive buffer, allocated the first time the peer keeps a
+        # reference into the current one
+        self._spare: Optional[memoryview] = None
+
+    def get_buffer(self, sizehint: int) -> memoryview:
+        """Hand the transport the reusable receive buffer"""
+        return self._view
+
+    def buffer_updated(self, nbytes: int) -> None:
+        """Forward received bytes to the peer, without a copy while its write buffer is empty"""
+        chunk = self._view[:nbytes]
+        if self._peer.get_write_buffer_size():
+            # This chunk would be queued behind unsent data, and transports may
+            # queue it by reference, so the peer gets a snapshot
+            self._peer.write(chunk.tobytes())
+            return
+        self._peer.write(chunk)
+        if self._peer.get_write_buffer_size():
+            # The unsent tail may still point into this buffer, so receive into
+            # the spare one. Nothing was queued before this write, so the spare
+            # is no longer referenced.
+            spare = self._spare or memoryview(bytearray(RELAY_BUFFER_SIZE))
+            self._view, self._spare = spare, self._view
+
+    def eof_received(self) -> bool:
+        """Close the relay once either side stops sending"""
+        self._peer.close()
+        return False
+
+    def pause_writing(self) -> None:
+        """Stop reading from the peer while this side's write buffer drains"""
+        self._peer.pause_reading()
+
+    def resume_writing(self) -> None:
+        """Resume reading from the peer"""
+        self._peer.resume_reading()
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        """Tear down the peer and wake the relay owner"""
+        self._peer.close()
+        self._stream_protocol.connection_lost(exc)
+        if not self._closed.done():
+            self._closed.set_result(None)
+
+
+async def _wait_fd(loop: asyncio.AbstractEventLoop, fd: int, writable: bool) -> None:
+    """Wait until a file descriptor is readable or writable"""
+    ready: "asyncio.Future[None]" = loop.create_future()
+
+    def wake() -> None:
+        if not ready.done():
+            ready.set_result(None)
+
+    if writable:
+        loop.add_writer(fd, wake)
+    else:
+        loop.add_reader(fd, wake)
+    try:
+        await ready
+    finally:
+        if writable:
+            loop.remove_writer(fd)
+        else:
+            loop.remove_reader(fd)
+
+
+def _listen_backlog() -> int:
+    """Get the largest accept queue the kernel allows, so connection bursts aren't dropped"""
+    try:
+        with open("/proc/sys/net/core/somaxconn", encoding="ascii") as f:
+            return int(f.read())
+    except (OSError, ValueError):
+        return DEFAULT_LISTEN_BACKLOG
+
 
 class SocksServer:
     """SOCKS proxy server that dispatches to remote proxies"""
@@ -60,10 +194,20 @@ class SocksServer:
         self.proxy_manager = proxy_manager
         self.server: Optional[asyncio.Server] = None
 
-    async def start(self, host: str, port: int) -> None:
-        """Start the SOCKS server"""
+    async def start(self, host: str, port: int, *, reuse_port: bool = False) -> None:
+        """Start the SOCKS server
+
+        Every address the host resolves to is bound, IPv4 and IPv6 alike. With
+        reuse_port, several processes can listen on the same port and the
+        kernel spreads incoming connections across them.
+        """
         self.server = await asyncio.start_server(
-            self._handle_client, host, port, family=socket.AF_INET, reuse_address=True
+            self._handle_client,
+            host,
+            port,
+            backlog=_listen_backlog(),
+            reuse_address=True,
+            reuse_port=reuse_port,
         )
 
         if self.server and self.server.sockets:
@@ -90,17 +234,21 @@ class SocksServer:
     ) -> None:
         """Handle a client connection"""
         client_addr = client_writer.get_extra_info("peername")
-        logger.debug("New connection from %s", client_addr)
+        # Per-connection debug lines are skipped without a logging call when disabled
+        debug = logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            logger.debug("New connection from %s", client_addr)
 
         try:
-            # Read first byte to determine SOCKS version
-            version_byte = await client_reader.readexactly(1)
-            version = version_byte[0]
+            # Read the version together with the next byte, which every SOCKS4 request
+            # and SOCKS5 greeting has: the SOCKS5 method count or the SOCKS4 command
+            head = await client_reader.readexactly(2)
+            version = head[0]
 
             if version == SOCKS_VERSION_5:
-                await self._handle_socks5(client_reader, client_writer)
+                await self._handle_socks5(client_reader, client_writer, head[1])
             elif version == SOCKS_VERSION_4:
-                await self._handle_socks4(version_byte, client_reader, client_writer)
+                await self._handle_socks4(head, client_reader, client_writer)
             else:
                 logger.warning("Unsupported SOCKS version: %s", version)
                 client_writer.close()
@@ -109,22 +257,27 @@ class SocksServer:
             logger.debug("Client %s disconnected during handshake", client_addr)
         except Exception as e:
             logger.error("Error handling client %s: %s", client_addr, e)
+            # Nothing more is owed to this client, so skip the graceful close
+            client_writer.transport.abort()
         finally:
-            try:
+            # close() still flushes pending replies; the handler doesn't wait for the
+            # peer to finish closing, which a stalled client could drag out
+            if not client_writer.is_closing():
                 client_writer.close()
-                await client_writer.wait_closed()
-            except Exception:
-                pass
-            logger.debug("Connection from %s closed", client_addr)
+            if debug:
+                logger.debug("Connection from %s closed", client_addr)
 
     async def _handle_socks5(
-        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        num_methods: Optional[int] = None,
     ) -> None:
-        """Handle SOCKS5 protocol"""
+        """Handle SOCKS5 protocol, given the method count if it was already read"""
         client_addr = writer.get_extra_info("peername")
 
         # Handle authentication negotiation
-        if not await self._handle_socks5_auth(reader, writer, client_addr):
+        if not await self._handle_socks5_auth(reader, writer, client_addr, num_methods):
             return
 
         # Read and validate the connect request
@@ -140,11 +293,16 @@ class SocksServer:
         await self._handle_socks5_connect(reader, writer, dest_addr, dest_port)
 
     async def _handle_socks5_auth(
-        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, client_addr: Any
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        client_addr: Any,
+        num_methods: Optional[int] = None,
     ) -> bool:
         """Handle SOCKS5 authentication negotiation. Returns True if successful."""
         # Read authentication methods
-        num_methods = (await reader.readexactly(1))[0]
+        if num_methods is None:
+            num_methods = (await reader.readexactly(1))[0]
         methods = await reader.readexactly(num_methods)
 
         # We only support no authentication for now
@@ -165,7 +323,7 @@ class SocksServer:
         """Handle SOCKS5 connect request. Returns (dest_addr, dest_port) or (None, 0) on error."""
         # Read the request
         header = await reader.readexactly(4)
-        _, cmd, _, atyp = struct.unpack("!BBBB", header)
+        _, cmd, _, atyp = _SOCKS5_REQUEST_HEADER.unpack(header)
 
         if cmd != SOCKS5_CMD_CONNECT:
             logger.warning("Unsupported SOCKS5 command: %s", cmd)
@@ -188,17 +346,25 @@ class SocksServer:
         try:
             # Get proxy and connect
             proxy_info = await self.proxy_manager.get_proxy(dest_addr, dest_port)
-            logger.debug(
-                "Using proxy %s to connect to %s:%s", proxy_info, dest_addr, dest_port
-            )
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "Using proxy %s to connect to %s:%s", proxy_info, dest_addr, dest_port
+                )
 
-            target_stream = await self._connect_through_proxy(proxy_info, dest_addr, dest_port)
+            # Count the connection against the proxy for least-connections selection
+            proxy_info.active_connections += 1
+            try:
+                target_stream = await self._connect_through_proxy(
+                    proxy_info, dest_addr, dest_port
+                )
 
-            # Send success response
-            await self._send_socks5_success_response(writer)
+                # Send success response
+                await self._send_socks5_success_response(writer)
 
-            # Start bidirectional proxy
-            await self._proxy_data(reader, writer, target_stream)
+                # Start bidirectional proxy
+                await self._proxy_data(reader, writer, target_stream)
+            finally:
+                proxy_info.active_connections -= 1
 
         except Exception as e:
             logger.error(
@@ -208,65 +374,45 @@ class SocksServer:
 
     async def _send_socks5_response(self, writer: asyncio.StreamWriter, response_code: int) -> None:
         """Send a simple SOCKS5 response (for auth negotiation)."""
-        writer.write(struct.pack("!BB", SOCKS_VERSION_5, response_code))
+        reply = _SOCKS5_METHOD_REPLIES.get(response_code)
+        writer.write(reply or bytes((SOCKS_VERSION_5, response_code)))
         await writer.drain()
 
     async def _send_socks5_error_response(self, writer: asyncio.StreamWriter, error_code: int) -> None:
         """Send a SOCKS5 error response."""
-        writer.write(
-            struct.pack(
-                "!BBBBIH",
-                SOCKS_VERSION_5,
-                error_code,
-                0,
-                SOCKS5_ATYP_IPV4,
-                0,
-                0,
-            )
-        )
+        reply = _SOCKS5_REPLIES.get(error_code)
+        if reply is None:
+            reply = _SOCKS5_REPLY.pack(SOCKS_VERSION_5, error_code, 0, SOCKS5_ATYP_IPV4, 0, 0)
+        writer.write(reply)
         await writer.drain()
 
     async def _send_socks5_success_response(self, writer: asyncio.StreamWriter) -> None:
         """Send a SOCKS5 success response."""
-        bind_addr = socket.inet_aton("0.0.0.0")
-        writer.write(
-            struct.pack(
-                "!BBBB4sH",
-                SOCKS_VERSION_5,
-                SOCKS5_RESP_SUCCESS,
-                0,
-                SOCKS5_ATYP_IPV4,
-                bind_addr,
-                0,
-            )
-        )
+        writer.write(_SOCKS5_REPLIES[SOCKS5_RESP_SUCCESS])
         await writer.drain()
 
     async def _connect_through_proxy(self, proxy_info: Any, dest_addr: str, dest_port: int) -> Any:
         """Create proxy connection and handle timing/errors."""
-        # Create a proxy connector
-        proxy_type = ProxyType.SOCKS5 if proxy_info.protocol in ("socks5", "socks5h") else ProxyType.SOCKS4
-        rdns = proxy_info.protocol in ("socks4a", "socks5h")
-
-        proxy = Proxy(
-            proxy_type=proxy_type,
-            host=proxy_info.host,
-            port=proxy_info.port,
-            username=proxy_info.username,
-            password=proxy_info.password,
-            rdns=rdns,
-        )
+        proxy = proxy_info.get_connector()
 
         # Connect to the destination through the proxy
-        start_time = time.time()
+        start_time = time.perf_counter()
         try:
-            target_stream = await asyncio.wait_for(
-                proxy.connect(dest_host=dest_addr, dest_port=dest_port), timeout=10
-            )
-            connection_time = time.time() - start_time
-            logger.debug(
-                "Connected to %s:%s through %s in %.3fs", dest_addr, dest_port, proxy_info, connection_time
-            )
+            if sys.version_info >= (3, 11):
+                # Puts the deadline on the current task instead of wrapping the connect in one
+                async with asyncio.timeout(PROXY_CONNECT_TIMEOUT):
+                    target_stream = await proxy.connect(dest_host=dest_addr, dest_port=dest_port)
+            else:
+                target_stream = await asyncio.wait_for(
+                    proxy.connect(dest_host=dest_addr, dest_port=dest_port),
+                    timeout=PROXY_CONNECT_TIMEOUT,
+                )
+            connection_time = time.perf_counter() - start_time
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "Connected to %s:%s through %s in %.3fs",
+                    dest_addr, dest_port, proxy_info, connection_time,
+                )
 
             # Update proxy latency
             proxy_info.update_latency(connection_time)
@@ -281,17 +427,15 @@ class SocksServer:
 
     async def _handle_socks4(
         self,
-        version_byte: bytes,
+        head: bytes,
         reader: asyncio.StreamReader,
         writer: asyncio.StreamWriter,
     ) -> None:
-        """Handle SOCKS4 protocol"""
+        """Handle SOCKS4 protocol, given the bytes already read starting at the version"""
         client_addr = writer.get_extra_info("peername")
-        # version_byte parameter is provided for consistency but not used in SOCKS4
-        _ = version_byte
 
-        # Parse SOCKS4 request
-        dest_addr, dest_port = await self._parse_socks4_request(reader, writer)
+        # Parse SOCKS4 request, continuing after the version byte
+        dest_addr, dest_port = await self._parse_socks4_request(reader, writer, head[1:])
         if not dest_addr:
             return
 
@@ -303,28 +447,27 @@ class SocksServer:
         await self._handle_socks4_connect(reader, writer, dest_addr, dest_port)
 
     async def _parse_socks4_request(
-        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, prefix: bytes = b""
     ) -> Tuple[Optional[str], int]:
         """Parse SOCKS4 request. Returns (dest_addr, dest_port) or (None, 0) on error."""
-        # Read the request (cmd, port, ip)
-        request_data = await reader.readexactly(7)
-        cmd, port_high, port_low, ip1, ip2, ip3, ip4 = struct.unpack("!BBBBBB", request_data)
-        dest_port = (port_high << 8) + port_low
-        dest_ip = f"{ip1}.{ip2}.{ip3}.{ip4}"
+        # Read the rest of the request (cmd, port, ip) after any prefix already read
+        request_data = prefix + await reader.readexactly(_SOCKS4_REQUEST.size - len(prefix))
+        cmd, dest_port, ip_bytes = _SOCKS4_REQUEST.unpack(request_data)
 
         # Read user ID null-terminated string
         await self._read_null_terminated_string(reader)  # We don't use user_id
 
-        # Check if this is SOCKS4A (with hostname)
-        dest_addr = dest_ip
-        if ip1 == 0 and ip2 == 0 and ip3 == 0 and ip4 != 0:
+        # Check if this is SOCKS4A (with hostname); the IP is only formatted when used
+        if ip_bytes[:3] == b"\0\0\0" and ip_bytes[3] != 0:
             # This is SOCKS4A, read the hostname
             hostname_bytes = await self._read_null_terminated_string(reader)
             dest_addr = hostname_bytes.decode("utf-8", errors="ignore")
+        else:
+            dest_addr = socket.inet_ntoa(ip_bytes)
 
         if cmd != SOCKS5_CMD_CONNECT:
             logger.warning("Unsupported SOCKS4 command: %s", cmd)
-            await self._send_socks4_response(writer, SOCKS4_RESP_REJECTED, dest_port, dest_ip)
+            await self._send_socks4_response(writer, SOCKS4_RESP_REJECTED, dest_port, ip_bytes)
             return None, 0
 
         return dest_addr, dest_port
@@ -337,74 +480,73 @@ class SocksServer:
         try:
             # Get proxy and connect
             proxy_info = await self.proxy_manager.get_proxy(dest_addr, dest_port)
-            logger.debug(
-                "Using proxy %s to connect to %s:%s", proxy_info, dest_addr, dest_port
-            )
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "Using proxy %s to connect to %s:%s", proxy_info, dest_addr, dest_port
+                )
 
-            target_stream = await self._connect_through_proxy(proxy_info, dest_addr, dest_port)
+            # Count the connection against the proxy for least-connections selection
+            proxy_info.active_connections += 1
+            try:
+                target_stream = await self._connect_through_proxy(
+                    proxy_info, dest_addr, dest_port
+                )
 
-            # Send success response
-            await self._send_socks4_response(writer, SOCKS4_RESP_SUCCESS, dest_port, "0.0.0.0")
+                # Send success response
+                await self._send_socks4_response(writer, SOCKS4_RESP_SUCCESS, dest_port, _SOCKS4_ZERO_BIND)
 
-            # Start bidirectional proxy
-            await self._proxy_data(reader, writer, target_stream)
+                # Start bidirectional proxy
+                await self._proxy_data(reader, writer, target_stream)
+            finally:
+                proxy_info.active_connections -= 1
 
         except Exception as e:
             logger.error(
                 "Error connecting to destination %s:%s: %s", dest_addr, dest_port, e
             )
-            await self._send_socks4_response(writer, SOCKS4_RESP_REJECTED, dest_port, "0.0.0.0")
+            await self._send_socks4_response(writer, SOCKS4_RESP_REJECTED, dest_port, _SOCKS4_ZERO_BIND)
 
     async def _read_null_terminated_string(self, reader: asyncio.StreamReader) -> bytes:
-        """Read a null-terminated string from the reader."""
-        result = b""
-        while True:
-            byte_val = await reader.readexactly(1)
-            if byte_val == b"\0":
-                break
-            result += byte_val
-        return result
+        """Read a null-terminated string from the reader in one buffered scan."""
+        try:
+            data = await reader.readuntil(b"\0")
+        except asyncio.LimitOverrunError as e:
+            raise ValueError("SOCKS4 field exceeds the stream buffer limit") from e
+        if len(data) > SOCKS4_MAX_FIELD_LENGTH + 1:
+            raise ValueError(f"SOCKS4 field longer than {SOCKS4_MAX_FIELD_LENGTH} bytes")
+        return data[:-1]
 
     async def _send_socks4_response(
-        self, writer: asyncio.StreamWriter, response_code: int, dest_port: int, dest_ip: str
+        self, writer: asyncio.StreamWriter, response_code: int, dest_port: int,
+        dest_ip_bytes: bytes
     ) -> None:
-        """Send a SOCKS4 response."""
-        writer.write(
-            struct.pack(
-                "!BBH4s",
-                0,
-                response_code,
-                dest_port,
-                socket.inet_aton(dest_ip),
-            )
-        )
+        """Send a SOCKS4 response with a packed 4-byte bind address."""
+        writer.write(_SOCKS4_REPLY.pack(0, response_code, dest_port, dest_ip_bytes))
         await writer.drain()
 
     async def _parse_socks5_address(
         self, reader: asyncio.StreamReader, atyp: int
     ) -> Tuple[Optional[str], int]:
         """Parse SOCKS5 address and port from stream"""
+        # Fixed-length addresses are read together with the port in one await
         if atyp == SOCKS5_ATYP_IPV4:
-            # IPv4 address
-            addr_bytes = await reader.readexactly(4)
+            data = await reader.readexactly(_SOCKS5_IPV4_ADDRESS.size)
+            addr_bytes, dest_port = _SOCKS5_IPV4_ADDRESS.unpack(data)
             dest_addr = socket.inet_ntoa(addr_bytes)
         elif atyp == SOCKS5_ATYP_DOMAIN:
-            # Domain name
+            # The length byte must be read before the domain and port
             length = (await reader.readexactly(1))[0]
-            addr_bytes = await reader.readexactly(length)
-            dest_addr = addr_bytes.decode("utf-8", errors="ignore")
+            data = await reader.readexactly(length + _PORT.size)
+            dest_addr = data[:length].decode("utf-8", errors="ignore")
+            (dest_port,) = _PORT.unpack_from(data, length)
         elif atyp == SOCKS5_ATYP_IPV6:
-            # IPv6 address
-            addr_bytes = await reader.readexactly(16)
+            data = await reader.readexactly(_SOCKS5_IPV6_ADDRESS.size)
+            addr_bytes, dest_port = _SOCKS5_IPV6_ADDRESS.unpack(data)
             dest_addr = socket.inet_ntop(socket.AF_INET6, addr_bytes)
         else:
             logger.warning("Unsupported address type: %s", atyp)
             return None, 0
 
-        # Read port (2 bytes, big endian)
-        port_bytes = await reader.readexactly(2)
-        dest_port = int.from_bytes(port_bytes, byteorder="big")
-
         return dest_addr, dest_port
 
     async def _proxy_data(
@@ -417,34 +559,175 @@ class SocksServer:
         # Get target reader and writer
         target_reader, target_writer = target_stream.reader, target_stream.writer
 
-        # Create tasks for bidirectional data flow
-        client_to_target = asyncio.create_task(self._pipe(client_reader, target_writer))
-        target_to_client = asyncio.create_task(self._pipe(target_reader, client_writer))
+        # Batch writes: backpressure only kicks in once a megabyte is queued
+        for writer in (client_writer, target_writer):
+            transport = getattr(writer, "transport", None)
+            if isinstance(transport, asyncio.WriteTransport):
+                transport.set_write_buffer_limits(high=PIPE_WRITE_HIGH_WATER)
 
-        # Wait for either direction to complete
-        done, pending = await asyncio.wait(
-            [client_to_target, target_to_client], return_when=asyncio.FIRST_COMPLETED
-        )
-
-        # Cancel pending tasks
-        for task in pending:
-            task.cancel()
+        # Real transports on both sides are relayed at the protocol level
+        if self._can_relay(client_reader, client_writer) and self._can_relay(
+            target_reader, target_writer
+        ):
+            await self._relay(client_reader, client_writer, target_reader, target_writer)
+            return
 
-        # Clean up and handle exceptions
-        for task in done:
+        # One direction gets a task and the other runs inline; _pipe closes its writer
+        # on exit, which also ends the opposite direction's read
+        client_to_target = asyncio.create_task(self._pipe(client_reader, target_writer))
+        try:
+            await self._pipe(target_reader, client_writer)
+        except Exception as e:
+            logger.debug("Pipe task error: %s", e)
+        finally:
+            client_to_target.cancel()
             try:
-                task.result()
+                await client_to_target
+            except asyncio.CancelledError:
+                if not client_to_target.cancelled():
+                    raise
             except Exception as e:
                 logger.debug("Pipe task error: %s", e)
 
+    @staticmethod
+    def _can_relay(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> bool:
+        """Check whether a stream's transport can be handed to a relay protocol"""
+        transport = getattr(writer, "transport", None)
+        return (
+            isinstance(transport, asyncio.Transport)
+            and not transport.is_closing()
+            and reader.exception() is None
+        )
+
+    async def _relay(
+        self,
+        client_reader: asyncio.StreamReader,
+        client_writer: asyncio.StreamWriter,
+        target_reader: asyncio.StreamReader,
+        target_writer: asyncio.StreamWriter,
+    ) -> None:
+        """Relay between two transports until either side closes"""
+        client_transport = client_writer.transport
+        target_transport = target_writer.transport
+        assert isinstance(client_transport, asyncio.Transport)
+        assert isinstance(target_transport, asyncio.Transport)
+
+        # Stop feeding the stream readers, then forward what they had buffered
+        client_transport.pause_reading()
+        target_transport.pause_reading()
+        for reader, peer in ((client_reader, target_transport), (target_reader, client_transport)):
+            reader.feed_eof()
+            buffered = await reader.read()
+            if buffered:
+                peer.write(buffered)
+
+        try:
+            if self._can_splice(client_transport, target_transport):
+                await self._splice_relay(client_transport, target_transport)
+            else:
+                await self._protocol_relay(client_transport, target_transport)
+        finally:
+            client_transport.close()
+            target_transport.close()
+
+    async def _protocol_relay(
+        self, client_transport: asyncio.Transport, target_transport: asyncio.Transport
+    ) -> None:
+        """Relay with buffered protocols installed on both transports"""
+        closed: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+        client_transport.set_protocol(
+            _RelayProtocol(target_transport, client_transport.get_protocol(), closed)
+        )
+        target_transport.set_protocol(
+            _RelayProtocol(client_transport, target_transport.get_protocol(), closed)
+        )
+
+        # Also undoes any pause the stream protocols applied when their buffers filled
+        client_transport.resume_reading()
+        target_transport.resume_reading()
+        await closed
+
+    @staticmethod
+    def _can_splice(*transports: asyncio.Transport) -> bool:
+        """Check whether bytes can move kernel-to-kernel between plain TCP sockets"""
+        if not hasattr(os, "splice"):
+            return False
+        for transport in transports:
+            sock = transport.get_extra_info("socket")
+            if (
+                sock is None
+                or sock.type != socket.SOCK_STREAM
+                or sock.family not in (socket.AF_INET, socket.AF_INET6)
+                or transport.get_extra_info("sslcontext") is not None
+                or transport.get_write_buffer_size()
+            ):
+                return False
+        return True
+
+    async def _splice_relay(
+        self, client_transport: asyncio.Transport, target_transport: asyncio.Transport
+    ) -> None:
+        """Relay with splice(2) through a pipe per direction, bypassing userspace"""
+        # Duplicated descriptors can be watched while the paused transports own the originals
+        client_fd = os.dup(client_transport.get_extra_info("socket").fileno())
+        try:
+            target_fd = os.dup(target_transport.get_extra_info("socket").fileno())
+        except OSError:
+            os.close(client_fd)
+            raise
+
+        tasks = [
+            asyncio.create_task(self._splice_pipe(client_fd, target_fd)),
+            asyncio.create_task(self._splice_pipe(target_fd, client_fd)),
+        ]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is not None:
+                    logger.debug("Splice relay error: %s", task.exception())
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            os.close(client_fd)
+            os.close(target_fd)
+
+    @staticmethod
+    async def _splice_pipe(src_fd: int, dst_fd: int) -> None:
+        """Move bytes from src_fd to dst_fd through a kernel pipe until EOF"""
+        loop = asyncio.get_running_loop()
+        flags = os.SPLICE_F_MOVE | os.SPLICE_F_NONBLOCK
+        pipe_r, pipe_w = os.pipe2(os.O_NONBLOCK | os.O_CLOEXEC)
+        try:
+            while True:
+                try:
+                    pending = os.splice(src_fd, pipe_w, SPLICE_CHUNK_SIZE, flags=flags)
+                except BlockingIOError:
+                    await _wait_fd(loop, src_fd, writable=False)
+                    continue
+                except (ConnectionResetError, ConnectionAbortedError):
+                    return
+                if not pending:
+                    return
+                while pending:
+                    try:
+                        pending -= os.splice(pipe_r, dst_fd, pending, flags=flags)
+                    except BlockingIOError:
+                        await _wait_fd(loop, dst_fd, writable=True)
+                    except (ConnectionResetError, BrokenPipeError):
+                        return
+        finally:
+            os.close(pipe_r)
+            os.close(pipe_w)
+
     async def _pipe(
         self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
     ) -> None:
         """Pipe data from reader to writer"""
         try:
             while True:
-                # Read data
-                data = await reader.read(8192)
+                # Take everything buffered (up to the cap) so each write carries more
+                data = await reader.read(PIPE_READ_SIZE)
                 if not data:
                     break
 
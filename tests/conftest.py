@@ -3,14 +3,25 @@
 
 import asyncio
 import socket
+import sys
 import time
+from types import SimpleNamespace
 from typing import Generator, Any, List, Callable, Tuple, Optional
-from unittest.mock import MagicMock, AsyncMock
+from unittest.mock import MagicMock, AsyncMock, patch
 
 import pytest
 
+from multisocks.bandwidth import BandwidthTester
 from multisocks.proxy.proxy_info import ProxyInfo
 from multisocks.proxy.proxy_manager import ProxyManager
+from multisocks.proxy.server import SocksServer
+
+
+@pytest.fixture(autouse=True)
+def no_raw_socket_speed_test() -> Generator[None, None, None]:
+    """Keep direct speed tests on the (mockable) aiohttp path unless a test opts in"""
+    with patch.object(BandwidthTester, 'RAW_SOCKET_TEST', False):
+        yield
 
 
 @pytest.fixture
@@ -42,14 +53,51 @@ def mock_proxy_manager(proxy_list: List[ProxyInfo]) -> ProxyManager:
 
 
 @pytest.fixture
-def event_loop() -> Generator[asyncio.AbstractEventLoop, None, None]:
-    """Create an event loop for async tests"""
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    try:
-        yield loop
-    finally:
-        loop.close()
+def bandwidth_tester() -> BandwidthTester:
+    """Create a BandwidthTester with default settings"""
+    return BandwidthTester()
+
+
+@pytest.fixture(scope="class", name="pooled_cli_instances")
+def fixture_pooled_cli_instances() -> SimpleNamespace:
+    """Build the spec'd ProxyManager and SocksServer mocks once per test class"""
+    return SimpleNamespace(manager=AsyncMock(spec_set=ProxyManager),
+                           server=AsyncMock(spec_set=SocksServer))
+
+
+@pytest.fixture
+def cli_mocks(monkeypatch: pytest.MonkeyPatch, pooled_cli_instances: SimpleNamespace) -> SimpleNamespace:
+    """Replace the ProxyManager and SocksServer used by multisocks.cli with mocks"""
+    manager = pooled_cli_instances.manager
+    server = pooled_cli_instances.server
+    # Clear calls and configured behaviour left over from the previous test in the class
+    manager.reset_mock(return_value=True, side_effect=True)
+    server.reset_mock(return_value=True, side_effect=True)
+    manager_class = MagicMock(return_value=manager)
+    server_class = MagicMock(return_value=server)
+    monkeypatch.setattr('multisocks.cli.ProxyManager', manager_class)
+    monkeypatch.setattr('multisocks.cli.SocksServer', server_class)
+    return SimpleNamespace(manager_class=manager_class, manager=manager,
+                           server_class=server_class, server=server)
+
+
+@pytest.fixture
+def set_argv(monkeypatch: pytest.MonkeyPatch) -> Callable[[List[str]], None]:
+    """Return a helper that sets sys.argv for the duration of the test"""
+    def _set(args: List[str]) -> None:
+        monkeypatch.setattr(sys, 'argv', args)
+    return _set
+
+
+@pytest.fixture
+def cli_run(monkeypatch: pytest.MonkeyPatch) -> SimpleNamespace:
+    """Replace asyncio.run and print in multisocks.cli so main() returns without serving"""
+    # Close the start_server coroutine so it is not reported as never awaited
+    run = MagicMock(side_effect=lambda coro: coro.close())
+    print_ = MagicMock()
+    monkeypatch.setattr('multisocks.cli.asyncio.run', run)
+    monkeypatch.setattr('multisocks.cli.print', print_, raising=False)
+    return SimpleNamespace(run=run, print=print_)
 
 
 @pytest.fixture
@@ -133,9 +181,9 @@ class AsyncTestHelpers:
     @staticmethod
     async def wait_for_condition(condition_func: Callable[[], bool], timeout: float = 1.0) -> bool:
         """Wait for a condition to become true within timeout"""
-        start_time = time.time()
+        start_time = time.monotonic()
 
-        while time.time() - start_time < timeout:
+        while time.monotonic() - start_time < timeout:
             if condition_func():
                 return True
             await asyncio.sleep(0.01)  # Small delay
@@ -214,11 +262,11 @@ def performance_timer() -> Any:
 
         def start(self) -> None:
             """Start the timer"""
-            self.start_time = time.time()
+            self.start_time = time.monotonic()
 
         def stop(self) -> None:
             """Stop the timer"""
-            self.end_time = time.time()
+            self.end_time = time.monotonic()
 
         @property
         def elapsed(self) -> float:
@@ -2,7 +2,7 @@
 """Additional tests focused solely on achieving 95%+ coverage"""
 
 import sys
-import subprocess
+import runpy
 import asyncio
 from typing import Dict, Any
 from unittest.mock import patch, MagicMock, AsyncMock
@@ -18,18 +18,13 @@ class TestCoverageTargeted:
 
     def test_main_module_execution_direct(self) -> None:
         """Test __main__.py execution to cover line 9"""
-        # This should cover the if __name__ == "__main__": main() line
-        try:
-            # Execute the module directly to trigger line 9
-            subprocess.run([
-                sys.executable, '-c',
-                'import multisocks.__main__; '
-                'multisocks.__main__.__name__ = "__main__"; '
-                'exec("if __name__ == \\"__main__\\": multisocks.__main__.main()")'
-            ], capture_output=True, text=True, timeout=5, check=False)
-            # Don't care about success, just that it executed line 9
-        except Exception:  # pylint: disable=broad-exception-caught
-            pass  # Any error is fine, we just want code coverage
+        # Run the module in-process as __main__ with main() patched out
+        with patch.dict(sys.modules), patch('multisocks.cli.main') as mock_main:
+            # A previously imported copy makes runpy warn about unpredictable behaviour
+            sys.modules.pop('multisocks.__main__', None)
+            runpy.run_module('multisocks', run_name='__main__', alter_sys=True)
+
+        mock_main.assert_called_once_with()
 
     def test_parse_proxy_edge_cases(self) -> None:
         """Test edge cases in CLI proxy parsing"""
@@ -37,11 +32,11 @@ class TestCoverageTargeted:
 
         # Test case where weight parsing fails but continues (lines 41-46)
         try:
-            with patch('re.search') as mock_search:
+            with patch('multisocks.cli._WEIGHT_RE') as mock_weight_re:
                 mock_match = MagicMock()
                 mock_match.group.return_value = "not_a_number"
                 mock_match.start.return_value = 10
-                mock_search.return_value = mock_match
+                mock_weight_re.search.return_value = mock_match
 
                 # This should hit the ValueError catch block that continues
                 proxy = parse_proxy_string("socks5://proxy.example.com:1080/xyz")
@@ -79,24 +74,25 @@ class TestCoverageTargeted:
             mock_response = MagicMock()
 
             # Mock to simulate reading data chunks
-            mock_response.content.read = AsyncMock(side_effect=[b'data', b''])
+            mock_response.content.iter_any = MagicMock()
+            mock_response.content.iter_any.return_value.__aiter__.return_value = [b'data']
 
             # Create proper async context managers
             mock_session.get.return_value.__aenter__ = AsyncMock(return_value=mock_response)
             mock_session.get.return_value.__aexit__ = AsyncMock(return_value=None)
-            mock_session_class.return_value.__aenter__ = AsyncMock(return_value=mock_session)
-            mock_session_class.return_value.__aexit__ = AsyncMock(return_value=None)
+            mock_session.head.return_value.__aenter__ = AsyncMock(return_value=mock_response)
+            mock_session.head.return_value.__aexit__ = AsyncMock(return_value=None)
+            mock_session_class.return_value = mock_session
 
             callback_calls = []
             def callback(event: str, data: Dict[str, Any]) -> None:
                 callback_calls.append((event, data))
 
-            with patch('multisocks.bandwidth.time.time', side_effect=[0, 1]):
-                try:
-                    await tester.measure_connection_speed(callback)
-                    # If successful, should have hit callback lines
-                except Exception:  # pylint: disable=broad-exception-caught
-                    pass
+            try:
+                await tester.measure_connection_speed(callback)
+                # If successful, should have hit callback lines
+            except Exception:  # pylint: disable=broad-exception-caught
+                pass
 
         # Test proxy speed measurement (lines 94-103)
         mock_proxy = MagicMock()
@@ -104,12 +100,11 @@ class TestCoverageTargeted:
         mock_proxy.configure_mock(**{"__str__.return_value": "socks5://proxy:1080"})
 
         with patch('aiohttp_socks.ProxyConnector.from_url'):
-            with patch('multisocks.bandwidth.aiohttp.ClientSession'):
-                with patch('multisocks.bandwidth.time.time', side_effect=[0, 1]):
-                    try:
-                        await tester.measure_proxy_speeds([mock_proxy])
-                    except Exception:  # pylint: disable=broad-exception-caught
-                        pass
+            with patch('multisocks.bandwidth.aiohttp.ClientSession', return_value=mock_session):
+                try:
+                    await tester.measure_proxy_speeds([mock_proxy])
+                except Exception:  # pylint: disable=broad-exception-caught
+                    pass
 
     @pytest.mark.asyncio
     async def test_proxy_manager_edge_cases(self) -> None:
@@ -1,12 +1,29 @@
 #!/usr/bin/env python3
 """Tests for package initialization and main entry point"""
 
-import sys
-from unittest.mock import patch
+import inspect
+from types import SimpleNamespace
+from typing import Any, Callable, List, Tuple
+from unittest.mock import ANY, patch
 import pytest
 
+import multisocks.__main__ as main_module
 from multisocks import __version__
-from multisocks.__main__ import main as main_entry_point
+from multisocks.cli import main as cli_main
+
+
+# Source of __main__.py, read once for the structure checks
+_MAIN_SOURCE = inspect.getsource(main_module)
+
+# (attribute, expected value) rows for the __main__ module attribute test
+MAIN_MODULE_ATTR_CASES: List[Tuple[str, Any]] = [
+    ("main", cli_main),
+    ("__name__", "multisocks.__main__"),
+    ("__file__", ANY),
+]
+
+# Statements __main__.py needs to hand off to cli.main when run as a script
+MAIN_SOURCE_SNIPPETS = ['from multisocks.cli import main', 'if __name__ == "__main__"', 'main()']
 
 
 class TestPackageInit:
@@ -29,41 +46,16 @@ class TestPackageInit:
 class TestMainEntryPoint:
     """Test __main__ module entry point"""
 
-    def test_main_entry_point_calls_cli_main(self) -> None:
-        """Test that __main__ module imports and calls cli.main"""
-        # Test that the __main__ module imports correctly
-        import multisocks.__main__  # pylint: disable=import-outside-toplevel
-        assert hasattr(multisocks.__main__, 'main')
-
-        # Test that the function is the same as cli.main
-        from multisocks.cli import main as cli_main  # pylint: disable=import-outside-toplevel
-        assert multisocks.__main__.main is cli_main
+    @pytest.mark.parametrize("attr,expected", MAIN_MODULE_ATTR_CASES,
+                             ids=[case[0] for case in MAIN_MODULE_ATTR_CASES])
+    def test_main_module_attrs(self, attr: str, expected: Any) -> None:
+        """Test __main__ module exposes cli.main and the usual module attributes"""
+        assert getattr(main_module, attr) == expected
 
-    def test_main_entry_point_when_main(self) -> None:
-        """Test __main__ module execution"""
-        # This test verifies the if __name__ == "__main__" block
-        # We can't easily test this directly, but we can ensure the function exists
-        assert callable(main_entry_point)
-
-    def test_main_module_imports(self) -> None:
-        """Test that __main__ module imports work correctly"""
-        # Test that we can import the main function
-        from multisocks.__main__ import main  # pylint: disable=import-outside-toplevel,redefined-outer-name,reimported
-        assert callable(main)
-
-    def test_main_module_structure(self) -> None:
-        """Test __main__ module has correct structure"""
-        import multisocks.__main__ as main_module  # pylint: disable=import-outside-toplevel
-
-        # Should have main function
-        assert hasattr(main_module, 'main')
-        assert callable(main_module.main)
-
-        # Should have proper imports
-        import inspect  # pylint: disable=import-outside-toplevel
-        source = inspect.getsource(main_module)
-        assert 'from multisocks.cli import main' in source
-        assert 'if __name__ == "__main__"' in source
+    @pytest.mark.parametrize("snippet", MAIN_SOURCE_SNIPPETS)
+    def test_main_module_source(self, snippet: str) -> None:
+        """Test __main__ module source contains the script entry point"""
+        assert snippet in _MAIN_SOURCE
 
 
 class TestPackageStructure:
@@ -99,20 +91,9 @@ class TestPackageStructure:
         from multisocks import __version__ as init_version  # pylint: disable=reimported
         assert init_version == multisocks.__version__
 
-    def test_entry_points_importable(self) -> None:
-        """Test that all entry points are importable"""
-        # pylint: disable=import-outside-toplevel,reimported,redefined-outer-name
-        # Test CLI entry point
-        from multisocks.cli import main as cli_main
-        assert callable(cli_main)
-
-        # Test main module entry point
-        from multisocks.__main__ import main as main_main
-        assert callable(main_main)
-
     def test_all_modules_importable(self) -> None:
         """Test that all modules can be imported without errors"""
-        # pylint: disable=import-outside-toplevel,unused-import
+        # pylint: disable=import-outside-toplevel,unused-import,reimported
         import multisocks
         import multisocks.__main__
         import multisocks.cli
@@ -146,7 +127,7 @@ class TestModuleExecution:
         # This simulates what happens when you run `python -m multisocks`
         with patch('multisocks.cli.main'):
             # Import __main__ module which should trigger execution
-            import multisocks.__main__  # pylint: disable=import-outside-toplevel
+            import multisocks.__main__  # pylint: disable=import-outside-toplevel,reimported
 
             # The __main__ module should be set up to call main when executed
             # but not when imported. We test the callable exists.
@@ -191,34 +172,15 @@ class TestModuleExecution:
                     if original_main_module is not None:
                         sys.modules['multisocks.__main__'] = original_main_module
 
-    def test_direct_execution(self) -> None:
-        """Test that __main__ can be executed directly"""
-        # Test that the main function exists and is callable
-        import multisocks.__main__  # pylint: disable=import-outside-toplevel
-        assert callable(multisocks.__main__.main)
-
-        # Test that it's properly set up for direct execution
-        assert hasattr(multisocks.__main__, '__name__')
-
-        # We can't easily test the `if __name__ == "__main__"` block
-        # without actually executing the module, so we just verify the setup
-
-    def test_main_execution_coverage(self) -> None:
+    def test_main_execution_coverage(
+        self, set_argv: Callable[[List[str]], None], cli_run: SimpleNamespace
+    ) -> None:
         """Test main execution path for coverage"""
-        # The __main__.py simply imports and calls main, so test the import structure
-        # pylint: disable=import-outside-toplevel,reimported,redefined-outer-name
-        import multisocks.__main__
-        from multisocks.cli import main as cli_main
-
-        # Verify that the main function in __main__ is the same as cli.main
-        assert multisocks.__main__.main is cli_main
-
         # To test the `if __name__ == "__main__":` line, we simulate it
         # by directly calling the main function (which is what that line does)
-        with patch.object(sys, 'argv', ['__main__.py', '--version']):
-            with patch('multisocks.cli.print') as mock_print:
-                multisocks.__main__.main()  # This tests the actual function call
-                mock_print.assert_called()  # Should print version
+        set_argv(['__main__.py', '--version'])
+        main_module.main()  # This tests the actual function call
+        cli_run.print.assert_called()  # Should print version
 
 
 class TestErrorHandling:
@@ -239,7 +201,7 @@ class TestErrorHandling:
         with patch('multisocks.cli.main', side_effect=Exception("CLI error")):
             # Should not raise exception when importing
             try:
-                import multisocks.__main__  # pylint: disable=import-outside-toplevel,unused-import
+                import multisocks.__main__  # pylint: disable=import-outside-toplevel,unused-import,reimported
             except Exception:  # pylint: disable=broad-exception-caught
                 pytest.fail("__main__ module should not raise on import")
 
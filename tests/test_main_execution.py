@@ -2,52 +2,21 @@
 """Tests for __main__.py execution to achieve complete coverage"""
 
 import sys
-import subprocess
+import runpy
 from unittest.mock import patch
 
 
 class TestMainModuleExecution:
     """Test direct execution of __main__.py to cover line 9"""
 
-    def test_main_module_direct_execution_via_subprocess(self) -> None:
-        """Test __main__.py execution via subprocess to cover if __name__ == '__main__'"""
-        # This covers the missing line 9 in __main__.py by actually executing the module
-        try:
-            # Run python -m multisocks --version to trigger __main__.py execution
-            result = subprocess.run(
-                [sys.executable, '-m', 'multisocks', '--version'],
-                capture_output=True,
-                text=True,
-                timeout=10,
-                check=False
-            )
+    def test_main_module_runs_main_as_script(self) -> None:
+        """Test running __main__.py as __main__ calls main() (covers the __name__ guard)"""
+        with patch.dict(sys.modules), patch('multisocks.cli.main') as mock_main:
+            # A previously imported copy makes runpy warn about unpredictable behaviour
+            sys.modules.pop('multisocks.__main__', None)
+            runpy.run_module('multisocks', run_name='__main__', alter_sys=True)
 
-            # Should complete successfully and show version
-            assert result.returncode == 0 or "MultiSocks version" in result.stdout
-        except subprocess.TimeoutExpired:
-            # If it hangs, that's also a form of successful execution
-            # The important thing is that __main__.py was executed
-            pass
-        except Exception:  # pylint: disable=broad-exception-caught
-            # Even if there are other issues, the __main__ execution was tested
-            pass
-
-    def test_main_module_name_main_condition(self) -> None:
-        """Test the __name__ == '__main__' condition directly"""
-        # Import the __main__ module
-        import multisocks.__main__ as main_module  # pylint: disable=import-outside-toplevel
-
-        # Test that the main function exists and is callable
-        assert hasattr(main_module, 'main')
-        assert callable(main_module.main)
-
-        # Test that the main function is properly imported from cli
-        from multisocks.cli import main as cli_main  # pylint: disable=import-outside-toplevel
-        assert main_module.main is cli_main
-
-        # Since main_module.main is the same as cli.main, calling it directly
-        # will execute the real function. The __name__ == "__main__" check in the module
-        # is already tested by the module execution tests.
+        mock_main.assert_called_once_with()
 
     def test_main_module_import_does_not_execute(self) -> None:
         """Test that importing __main__ module doesn't execute main()"""
@@ -57,22 +26,3 @@ class TestMainModuleExecution:
 
             # main() should not have been called during import
             mock_main.assert_not_called()
-
-    def test_main_module_structure(self) -> None:
-        """Test __main__ module has expected structure"""
-        # pylint: disable=import-outside-toplevel
-        import multisocks.__main__ as main_module
-
-        # Should import main from cli
-        from multisocks.cli import main as cli_main
-        assert main_module.main is cli_main
-
-        # Should have proper module attributes
-        assert hasattr(main_module, '__file__')
-        assert hasattr(main_module, '__name__')
-
-        # Check that the module contains the expected execution guard
-        import inspect
-        source = inspect.getsource(main_module)
-        assert 'if __name__ == "__main__"' in source
-        assert 'main()' in source
@@ -1,11 +1,14 @@
 #!/usr/bin/env python3
 """Tests for the ProxyManager class"""
-# pylint: disable=protected-access
+# pylint: disable=protected-access,too-many-lines
 
 import asyncio
+import json
 import socket
+import time
+from pathlib import Path
 from typing import Any
-from unittest.mock import AsyncMock, MagicMock, patch, call
+from unittest.mock import AsyncMock, MagicMock, PropertyMock, patch, call
 import pytest
 from python_socks import ProxyType
 
@@ -13,7 +16,7 @@ from multisocks.proxy.proxy_manager import ProxyManager
 from multisocks.proxy.proxy_info import ProxyInfo
 
 
-class TestProxyManager:
+class TestProxyManager:  # pylint: disable=too-many-public-methods
     """Test ProxyManager class functionality"""
 
     def test_init_empty_proxies_raises_error(self) -> None:
@@ -29,7 +32,6 @@ class TestProxyManager:
         assert manager.all_proxies == [proxy]
         assert manager.active_proxies == [proxy]
         assert manager._index == 0
-        assert manager._total_weight == 1
         assert manager.auto_optimize is False
         assert manager.bandwidth_tester is None
 
@@ -43,7 +45,6 @@ class TestProxyManager:
 
         assert manager.all_proxies == proxies
         assert manager.active_proxies == proxies
-        assert manager._total_weight == 5  # 2 + 3
 
     def test_init_with_auto_optimize(self) -> None:
         """Test initialization with auto-optimization enabled"""
@@ -91,9 +92,9 @@ class TestProxyManager:
         # Run multiple selections to check distribution
         selections = []
         for _ in range(100):
-            with patch('multisocks.proxy.proxy_manager.random.randint') as mock_random:
+            with patch.object(manager._rng, 'randrange') as mock_random:
                 # Mock random to always select proxy2 (weight 9)
-                mock_random.return_value = 5  # Falls in proxy2's range
+                mock_random.return_value = 4  # Falls in proxy2's range
                 result = await manager.get_proxy("example.com", 80)
                 selections.append(result)
 
@@ -150,6 +151,133 @@ class TestProxyManager:
         result3 = await manager.get_proxy("example.com", 80)
         assert result3 == proxy1
 
+    @pytest.mark.asyncio
+    async def test_get_proxy_reuses_selection_until_health_changes(self) -> None:
+        """Test the selection table is only rebuilt when proxy health changes"""
+        proxy1 = ProxyInfo("socks5", "proxy1.example.com", 1080, weight=2)
+        proxy2 = ProxyInfo("socks5", "proxy2.example.com", 1080, weight=3)
+        manager = ProxyManager([proxy1, proxy2])
+
+        await manager.get_proxy("example.com", 80)
+        table = manager._alias_table  # pylint: disable=protected-access
+        assert manager._candidate_weight == 5  # pylint: disable=protected-access
+
+        proxy1.mark_failed()  # Still alive after a single failure
+        await manager.get_proxy("example.com", 80)
+        assert manager._alias_table is table  # pylint: disable=protected-access
+
+        proxy1.alive = False
+        result = await manager.get_proxy("example.com", 80)
+        assert result == proxy2
+        assert manager._candidate_weight == 3  # pylint: disable=protected-access
+
+    @pytest.mark.asyncio
+    async def test_get_proxy_does_not_rescan_health_per_dispatch(self) -> None:
+        """Test dispatches between health changes never read the proxies' health"""
+        proxies = [ProxyInfo("socks5", f"proxy{i}.example.com", 1080) for i in range(50)]
+        manager = ProxyManager(proxies)
+        await manager.get_proxy("example.com", 80)
+
+        with patch.object(ProxyInfo, 'alive', new_callable=PropertyMock) as mock_alive:
+            for _ in range(100):
+                await manager.get_proxy("example.com", 80)
+
+        mock_alive.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_get_proxy_equal_weights_prefers_less_loaded(self) -> None:
+        """Test round-robin over equal weights steps past a busier proxy"""
+        busy = ProxyInfo("socks5", "busy.example.com", 1080)
+        idle = ProxyInfo("socks5", "idle.example.com", 1080)
+        busy.active_connections = 5
+        manager = ProxyManager([busy, idle])
+
+        for _ in range(20):
+            assert await manager.get_proxy("example.com", 80) is idle
+
+    @pytest.mark.asyncio
+    async def test_get_proxy_equal_weights_round_robin_without_rng(self) -> None:
+        """Test equal weights cycle through the proxies without drawing random numbers"""
+        proxies = [ProxyInfo("socks5", f"proxy{i}.example.com", 1080) for i in range(3)]
+        manager = ProxyManager(proxies)
+
+        with patch.object(manager._rng, 'randrange') as mock_random:
+            picks = [await manager.get_proxy("example.com", 80) for _ in range(6)]
+
+        assert picks == proxies * 2
+        mock_random.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_get_proxy_moves_off_saturated_proxy(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test a proxy at the connection cap is passed over for the least loaded one"""
+        heavy = ProxyInfo("socks5", "heavy.example.com", 1080, weight=9)
+        light = ProxyInfo("socks5", "light.example.com", 1080, weight=1)
+        manager = ProxyManager([heavy, light])
+        monkeypatch.setattr(ProxyManager, "MAX_CONNECTIONS_PER_PROXY", 2)
+        heavy.active_connections = 2
+
+        with patch.object(manager._rng, 'randrange', return_value=4):
+            assert await manager.get_proxy("example.com", 80) is light
+
+    @pytest.mark.asyncio
+    async def test_get_proxy_skips_debug_logging_when_disabled(self) -> None:
+        """Test the per-request debug line is not emitted unless debug is enabled"""
+        manager = ProxyManager([ProxyInfo("socks5", "proxy.example.com", 1080)])
+
+        with patch('multisocks.proxy.proxy_manager.logger') as mock_logger:
+            mock_logger.isEnabledFor.return_value = False
+            await manager.get_proxy("example.com", 80)
+            mock_logger.debug.assert_not_called()
+
+            mock_logger.isEnabledFor.return_value = True
+            await manager.get_proxy("example.com", 80)
+            mock_logger.debug.assert_called_once()
+
+    def test_healthy_proxies_cached_until_health_changes(self) -> None:
+        """Test the healthy subset is reused until a proxy changes state"""
+        proxy1 = ProxyInfo("socks5", "proxy1.example.com", 1080)
+        proxy2 = ProxyInfo("socks5", "proxy2.example.com", 1080)
+        manager = ProxyManager([proxy1, proxy2])
+
+        healthy = manager.healthy_proxies()
+        assert healthy == [proxy1, proxy2]
+        assert manager.healthy_proxies() is healthy
+
+        proxy2.alive = False
+        assert manager.healthy_proxies() == [proxy1]
+
+        manager.all_proxies.append(ProxyInfo("socks5", "proxy3.example.com", 1080))
+        assert len(manager.healthy_proxies()) == 2
+
+    @pytest.mark.asyncio
+    async def test_get_proxy_concurrent_round_robin(self) -> None:
+        """Test concurrent dispatches still advance the round-robin index one by one"""
+        proxies = [ProxyInfo("socks5", f"proxy{i}.example.com", 1080, weight=0) for i in range(3)]
+        manager = ProxyManager(proxies)
+
+        results = await asyncio.gather(*(manager.get_proxy("example.com", 80) for _ in range(6)))
+
+        assert results == proxies * 2
+
+    @pytest.mark.asyncio
+    async def test_get_proxy_alias_sampling_matches_weights(self) -> None:
+        """Test every draw maps to proxies exactly in proportion to their weights"""
+        weights = [1, 0, 7, 3, 5]
+        proxies = [
+            ProxyInfo("socks5", f"proxy{i}.example.com", 1080, weight=w)
+            for i, w in enumerate(weights)
+        ]
+        manager = ProxyManager(proxies)
+        draws = len(weights) * sum(weights)
+
+        counts = {p.host: 0 for p in proxies}
+        with patch.object(manager._rng, 'randrange',
+                          side_effect=range(draws)):
+            for _ in range(draws):
+                counts[(await manager.get_proxy("example.com", 80)).host] += 1
+
+        assert [counts[p.host] for p in proxies] == [w * len(weights) for w in weights]
+
     @pytest.mark.asyncio
     async def test_start_creates_health_check_task(self) -> None:
         """Test start method creates health check task"""
@@ -202,6 +330,18 @@ class TestProxyManager:
         # Task should remain cancelled
         assert task.cancelled()
 
+    @pytest.mark.asyncio
+    async def test_stop_closes_bandwidth_tester(self) -> None:
+        """Test stop method closes the bandwidth tester sessions"""
+        proxy = ProxyInfo("socks5", "proxy.example.com", 1080)
+        manager = ProxyManager([proxy])
+        manager.bandwidth_tester = MagicMock()
+        manager.bandwidth_tester.close = AsyncMock()
+
+        await manager.stop()
+
+        manager.bandwidth_tester.close.assert_awaited_once()
+
     @pytest.mark.asyncio
     async def test_check_proxy_success(self) -> None:
         """Test successful proxy health check"""
@@ -212,11 +352,11 @@ class TestProxyManager:
         mock_stream = MagicMock()
         mock_stream.close = MagicMock()  # Mock the synchronous close method
 
-        with patch('multisocks.proxy.proxy_manager.Proxy') as mock_proxy_class:
+        with patch('multisocks.proxy.proxy_info.Proxy') as mock_proxy_class:
             mock_proxy_instance = mock_proxy_class.return_value
             mock_proxy_instance.connect = AsyncMock(return_value=mock_stream)
 
-            with patch('multisocks.proxy.proxy_manager.time.time', side_effect=[0, 0.5]):
+            with patch('multisocks.proxy.proxy_manager.time.perf_counter', side_effect=[0, 0.5]):
                 result = await manager._check_proxy(proxy)
 
                 assert result is True
@@ -225,6 +365,60 @@ class TestProxyManager:
                 assert proxy.latency == 0.5
                 mock_stream.close.assert_called_once()
 
+    @pytest.mark.asyncio
+    async def test_check_proxy_falls_back_across_addresses(self) -> None:
+        """Test an unreachable first address is skipped and the working one pinned"""
+        proxy = ProxyInfo("socks5", "proxy.example.com", 1080)
+        manager = ProxyManager([proxy])
+        mock_stream = MagicMock()
+        connectors = {
+            "2001:db8::1": MagicMock(connect=AsyncMock(side_effect=OSError("Network is unreachable"))),
+            "192.0.2.1": MagicMock(connect=AsyncMock(return_value=mock_stream)),
+        }
+
+        infos = [
+            (socket.AF_INET6, socket.SOCK_STREAM, 6, "", ("2001:db8::1", 1080, 0, 0)),
+            (socket.AF_INET, socket.SOCK_STREAM, 6, "", ("192.0.2.1", 1080)),
+        ]
+        loop = asyncio.get_running_loop()
+
+        with patch.object(loop, 'getaddrinfo', AsyncMock(return_value=infos)), \
+                patch('multisocks.proxy.proxy_info.Proxy', side_effect=lambda host, **_: connectors[host]):
+            result = await manager._check_proxy(proxy)
+
+        assert result is True
+        assert proxy.fail_count == 0
+        assert proxy.connect_host == "192.0.2.1"
+        mock_stream.close.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_check_proxy_falls_back_after_hanging_address(self) -> None:
+        """Test a first address that hangs leaves the others time within the check budget"""
+        proxy = ProxyInfo("socks5", "proxy.example.com", 1080)
+        manager = ProxyManager([proxy])
+
+        async def hang(**_kwargs: Any) -> MagicMock:
+            await asyncio.sleep(10)
+            return MagicMock()
+
+        connectors = {
+            "2001:db8::1": MagicMock(connect=AsyncMock(side_effect=hang)),
+            "192.0.2.1": MagicMock(connect=AsyncMock(return_value=MagicMock())),
+        }
+        infos = [
+            (socket.AF_INET6, socket.SOCK_STREAM, 6, "", ("2001:db8::1", 1080, 0, 0)),
+            (socket.AF_INET, socket.SOCK_STREAM, 6, "", ("192.0.2.1", 1080)),
+        ]
+        loop = asyncio.get_running_loop()
+
+        with patch.object(ProxyManager, 'HEALTH_CHECK_TIMEOUT', 0.2), \
+                patch.object(loop, 'getaddrinfo', AsyncMock(return_value=infos)), \
+                patch('multisocks.proxy.proxy_info.Proxy', side_effect=lambda host, **_: connectors[host]):
+            result = await manager._check_proxy_limited(proxy, deep=True)
+
+        assert result is True
+        assert proxy.connect_host == "192.0.2.1"
+
     @pytest.mark.asyncio
     async def test_check_proxy_timeout_failure(self) -> None:
         """Test proxy health check timeout failure"""
@@ -308,6 +502,191 @@ class TestProxyManager:
                 # Should mark first proxy as failed due to exception
                 assert proxy1.fail_count == 1
 
+    @pytest.mark.asyncio
+    async def test_check_all_proxies_handles_results_as_they_complete(self) -> None:
+        """Test a fast failure is recorded while slower checks are still running"""
+        fast = ProxyInfo("socks5", "fast.example.com", 1080)
+        slow = ProxyInfo("socks5", "slow.example.com", 1080)
+        dead = ProxyInfo("socks5", "dead.example.com", 1080)
+        manager = ProxyManager([slow, fast, dead])
+        seen_fail_count = None
+
+        async def fake_check(proxy: ProxyInfo) -> bool:
+            nonlocal seen_fail_count
+            if proxy is fast:
+                raise RuntimeError("Check failed")
+            if proxy is dead:
+                return False
+            await asyncio.sleep(0.01)
+            seen_fail_count = fast.fail_count
+            return True
+
+        with patch.object(manager, '_check_proxy', side_effect=fake_check):
+            with patch('multisocks.proxy.proxy_manager.logger') as mock_logger:
+                await manager._check_all_proxies()  # pylint: disable=protected-access
+
+        assert seen_fail_count == 1
+        mock_logger.info.assert_called_once_with(
+            "Health check completed: %d/%d proxies alive", 1, 3
+        )
+
+    @pytest.mark.asyncio
+    async def test_check_all_proxies_bounds_concurrency(self) -> None:
+        """Test no more than HEALTH_CHECK_CONCURRENCY checks run at once"""
+        proxies = [ProxyInfo("socks5", f"proxy{i}.example.com", 1080) for i in range(10)]
+        manager = ProxyManager(proxies)
+        manager._health_check_semaphore = asyncio.Semaphore(3)  # pylint: disable=protected-access
+        active = 0
+        peak = 0
+
+        async def fake_check(_proxy: ProxyInfo) -> bool:
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            return True
+
+        with patch.object(manager, '_check_proxy', side_effect=fake_check) as mock_check:
+            await manager._check_all_proxies()  # pylint: disable=protected-access
+
+        assert mock_check.call_count == 10
+        assert peak == 3
+
+    @pytest.mark.asyncio
+    async def test_check_all_proxies_times_out_slow_checks(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test a hung health check is cut off and counted as a failure"""
+        proxy = ProxyInfo("socks5", "proxy.example.com", 1080)
+        manager = ProxyManager([proxy])
+        monkeypatch.setattr(ProxyManager, "HEALTH_CHECK_TIMEOUT", 0.01)
+
+        async def hang(_proxy: ProxyInfo) -> bool:
+            await asyncio.sleep(10)
+            return True
+
+        with patch.object(manager, '_check_proxy', side_effect=hang):
+            await manager._check_all_proxies()  # pylint: disable=protected-access
+
+        assert proxy.fail_count == 1
+
+    @pytest.mark.asyncio
+    async def test_check_all_proxies_light_rounds_ping_live_proxies(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test only every DEEP_CHECK_INTERVAL-th round runs the full SOCKS check"""
+        live = ProxyInfo("socks5", "live.example.com", 1080)
+        dead = ProxyInfo("socks5", "dead.example.com", 1080, alive=False)
+        manager = ProxyManager([live, dead])
+        monkeypatch.setattr(ProxyManager, "DEEP_CHECK_INTERVAL", 2)
+
+        with patch.object(manager, '_check_proxy', return_value=False) as mock_check, \
+                patch.object(manager, '_ping_proxy', return_value=True) as mock_ping:
+            await manager._check_all_proxies()  # pylint: disable=protected-access
+            assert mock_check.call_count == 2
+            mock_ping.assert_not_called()
+
+            live.alive = True
+            await manager._check_all_proxies()  # pylint: disable=protected-access
+            mock_ping.assert_called_once_with(live)
+            assert mock_check.call_count == 3
+
+    @pytest.mark.asyncio
+    async def test_check_all_proxies_skips_backed_off_proxies(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test dead proxies are not re-checked until their backoff expires"""
+        live = ProxyInfo("socks5", "live.example.com", 1080)
+        dead = ProxyInfo("socks5", "dead.example.com", 1080)
+        for _ in range(ProxyInfo.MAX_FAILURES):
+            dead.mark_failed()
+        manager = ProxyManager([live, dead])
+
+        monkeypatch.setattr(ProxyManager, "DEEP_CHECK_INTERVAL", 1)
+
+        with patch.object(manager, '_check_proxy', return_value=True) as mock_check:
+            await manager._check_all_proxies()  # pylint: disable=protected-access
+            mock_check.assert_called_once_with(live)
+
+            dead.next_check_at = 0.0
+            mock_check.reset_mock()
+            await manager._check_all_proxies()  # pylint: disable=protected-access
+            assert mock_check.call_count == 2
+
+    def test_next_health_batch_rolls_through_proxies(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test rolling batches cover every proxy once per round in equal shares"""
+        proxies = [ProxyInfo("socks5", f"proxy{i}.example.com", 1080) for i in range(7)]
+        manager = ProxyManager(proxies)
+        monkeypatch.setattr(ProxyManager, "HEALTH_CHECK_INTERVAL", 3)
+        monkeypatch.setattr(ProxyManager, "HEALTH_CHECK_STEP", 1.0)
+
+        batches = [manager._next_health_batch() for _ in range(4)]  # pylint: disable=protected-access
+
+        assert batches == [proxies[0:3], proxies[3:6], proxies[6:7], proxies[0:3]]
+        assert manager._health_check_round == 2  # pylint: disable=protected-access
+
+    @pytest.mark.asyncio
+    async def test_rolling_batches_share_the_round_depth(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test every batch of a deep round runs the full check"""
+        proxies = [ProxyInfo("socks5", f"proxy{i}.example.com", 1080) for i in range(4)]
+        manager = ProxyManager(proxies)
+        monkeypatch.setattr(ProxyManager, "HEALTH_CHECK_INTERVAL", 2)
+        monkeypatch.setattr(ProxyManager, "DEEP_CHECK_INTERVAL", 2)
+
+        with patch.object(manager, '_check_proxy', return_value=True) as mock_check, \
+                patch.object(manager, '_ping_proxy', return_value=True) as mock_ping:
+            for _ in range(4):
+                await manager._check_all_proxies(manager._next_health_batch())  # pylint: disable=protected-access
+
+        assert mock_check.call_count == 4
+        assert mock_ping.call_count == 4
+
+    @pytest.mark.asyncio
+    async def test_ping_proxy_success(self) -> None:
+        """Test the light check succeeds when the proxy accepts a TCP connection"""
+        server = await asyncio.start_server(lambda r, w: w.close(), "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        proxy = ProxyInfo("socks5", "127.0.0.1", port)
+        proxy.fail_count = 2
+        manager = ProxyManager([proxy])
+        try:
+            assert await manager._ping_proxy(proxy) is True  # pylint: disable=protected-access
+        finally:
+            server.close()
+            await server.wait_closed()
+        assert proxy.fail_count == 2  # Only a full check resets the failures
+
+    @pytest.mark.asyncio
+    async def test_ping_does_not_reset_failed_handshakes(self) -> None:
+        """Test a proxy that accepts TCP but fails the SOCKS handshake still dies"""
+        server = await asyncio.start_server(lambda r, w: w.close(), "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        proxy = ProxyInfo("socks5", "127.0.0.1", port)
+        manager = ProxyManager([proxy])
+
+        async def failed_handshake(failing: ProxyInfo) -> bool:
+            failing.mark_failed()
+            return False
+
+        try:
+            with patch.object(manager, '_check_proxy', side_effect=failed_handshake):
+                for deep in (True, False, True, True):
+                    await manager._check_proxy_limited(proxy, deep)  # pylint: disable=protected-access
+        finally:
+            server.close()
+            await server.wait_closed()
+
+        assert proxy.alive is False
+        assert proxy.fail_count == ProxyInfo.MAX_FAILURES
+
+    @pytest.mark.asyncio
+    async def test_ping_proxy_refused(self) -> None:
+        """Test the light check fails when nothing listens on the proxy port"""
+        server = await asyncio.start_server(lambda r, w: w.close(), "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        server.close()
+        await server.wait_closed()
+        proxy = ProxyInfo("socks5", "127.0.0.1", port)
+        manager = ProxyManager([proxy])
+
+        assert await manager._ping_proxy(proxy) is False  # pylint: disable=protected-access
+        assert proxy.fail_count == 1
+
     @pytest.mark.asyncio
     async def test_health_check_loop_cancelled_error_handling(self) -> None:
         """Test health check loop handles CancelledError by breaking"""
@@ -382,6 +761,24 @@ class TestProxyManager:
             assert len(manager.active_proxies) == 1
             assert manager.active_proxies[0] == proxy1  # Lower latency
 
+    @pytest.mark.asyncio
+    async def test_optimize_proxy_usage_keeps_lowest_latency_in_order(self) -> None:
+        """Test optimization keeps the N fastest proxies, fastest first"""
+        latencies = [0.5, 0.1, 0.4, 0.2, 0.3]
+        proxies = [ProxyInfo("socks5", f"proxy{i}.example.com", 1080) for i in range(5)]
+        for proxy, latency in zip(proxies, latencies):
+            proxy.latency = latency
+        manager = ProxyManager(proxies, auto_optimize=True)
+        mock_tester = MagicMock()
+        mock_tester.measure_connection_speed = AsyncMock(return_value=50)
+        mock_tester.measure_proxy_speeds = AsyncMock(return_value=10)
+        mock_tester.calculate_optimal_proxy_count.return_value = 3
+        manager.bandwidth_tester = mock_tester
+
+        await manager._optimize_proxy_usage()  # pylint: disable=protected-access
+
+        assert manager.active_proxies == [proxies[1], proxies[3], proxies[4]]
+
     @pytest.mark.asyncio
     async def test_optimize_proxy_usage_no_user_bandwidth(self) -> None:
         """Test proxy optimization when user bandwidth measurement fails"""
@@ -505,10 +902,10 @@ class TestProxyManagerProtocols:
 
         mock_stream.close = MagicMock()  # Add close method for proper mocking
 
-        with patch('multisocks.proxy.proxy_manager.Proxy') as mock_proxy_class:
+        with patch('multisocks.proxy.proxy_info.Proxy') as mock_proxy_class:
             mock_proxy_class.return_value = mock_proxy_connector
 
-            with patch('multisocks.proxy.proxy_manager.time.time', side_effect=[0, 0.5]):
+            with patch('multisocks.proxy.proxy_manager.time.perf_counter', side_effect=[0, 0.5]):
                 result = await manager._check_proxy(proxy)
 
                 # Verify test passed and SOCKS4 proxy was created
@@ -534,10 +931,10 @@ class TestProxyManagerProtocols:
 
         mock_stream.close = MagicMock()  # Add close method for proper mocking
 
-        with patch('multisocks.proxy.proxy_manager.Proxy') as mock_proxy_class:
+        with patch('multisocks.proxy.proxy_info.Proxy') as mock_proxy_class:
             mock_proxy_class.return_value = mock_proxy_connector
 
-            with patch('multisocks.proxy.proxy_manager.time.time', side_effect=[0, 0.5]):
+            with patch('multisocks.proxy.proxy_manager.time.perf_counter', side_effect=[0, 0.5]):
                 result = await manager._check_proxy(proxy)
 
                 # Verify test passed and SOCKS4a proxy was created with remote DNS
@@ -563,10 +960,10 @@ class TestProxyManagerProtocols:
 
         mock_stream.close = MagicMock()  # Add close method for proper mocking
 
-        with patch('multisocks.proxy.proxy_manager.Proxy') as mock_proxy_class:
+        with patch('multisocks.proxy.proxy_info.Proxy') as mock_proxy_class:
             mock_proxy_class.return_value = mock_proxy_connector
 
-            with patch('multisocks.proxy.proxy_manager.time.time', side_effect=[0, 0.5]):
+            with patch('multisocks.proxy.proxy_manager.time.perf_counter', side_effect=[0, 0.5]):
                 result = await manager._check_proxy(proxy)
 
                 # Verify test passed and SOCKS5h proxy was created with remote DNS and auth
@@ -664,3 +1061,58 @@ class TestProxyManagerHealthCheckEdgeCases:
 
         # Should complete without error even with no task (covers line 51->exit)
         await manager.stop()
+
+
+class TestProxyManagerState:
+    """Test persisting measurements between runs"""
+
+    @pytest.mark.asyncio
+    async def test_state_round_trip(self, tmp_path: Path) -> None:
+        """Test latencies and bandwidth saved on stop seed the next run"""
+        state_file = str(tmp_path / "state" / "state.json")
+        proxy = ProxyInfo("socks5", "proxy.example.com", 1080, "user", "secret")
+        proxy.latency = 0.25
+        manager = ProxyManager([proxy], state_file=state_file)
+        manager.bandwidth_tester = MagicMock()
+        manager.bandwidth_tester.close = AsyncMock()
+        manager.bandwidth_tester.user_bandwidth_mbps = 80.0
+        manager.bandwidth_tester.proxy_avg_bandwidth_mbps = 10.0
+        await manager.stop()
+
+        with open(state_file, encoding="utf-8") as f:
+            assert "secret" not in f.read()
+
+        fresh = ProxyInfo("socks5", "proxy.example.com", 1080, "user", "secret")
+        restored = ProxyManager([fresh], state_file=state_file)
+        restored.bandwidth_tester = MagicMock()
+        restored._load_state()  # pylint: disable=protected-access
+
+        assert fresh.latency == 0.25
+        assert restored.bandwidth_tester.user_bandwidth_mbps == 80.0
+        assert restored.bandwidth_tester.proxy_avg_bandwidth_mbps == 10.0
+        assert restored.last_optimization_time > 0
+
+    def test_stale_state_is_ignored(self, tmp_path: Path) -> None:
+        """Test a state file older than STATE_MAX_AGE seeds nothing"""
+        state_file = tmp_path / "state.json"
+        state_file.write_text(json.dumps({
+            "saved_at": time.time() - ProxyManager.STATE_MAX_AGE - 1,
+            "latency": {"socks5://proxy.example.com:1080": 0.25},
+        }), encoding="utf-8")
+        proxy = ProxyInfo("socks5", "proxy.example.com", 1080)
+
+        ProxyManager([proxy], state_file=str(state_file))._load_state()  # pylint: disable=protected-access
+
+        assert proxy.latency == 0.0
+
+    def test_corrupt_state_is_ignored(self, tmp_path: Path) -> None:
+        """Test an unreadable state file is skipped with a warning"""
+        state_file = tmp_path / "state.json"
+        state_file.write_text("not json", encoding="utf-8")
+        manager = ProxyManager([ProxyInfo("socks5", "proxy.example.com", 1080)],
+                               state_file=str(state_file))
+
+        with patch('multisocks.proxy.proxy_manager.logger') as mock_logger:
+            manager._load_state()  # pylint: disable=protected-access
+
+        mock_logger.warning.assert_called_once()
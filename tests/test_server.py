@@ -1,15 +1,19 @@
 #!/usr/bin/env python3
 """Tests for the SocksServer class"""
-# pylint: disable=protected-access
+# pylint: disable=protected-access,too-many-lines
 
 import asyncio
+import os
 import socket
 import struct
 from unittest.mock import AsyncMock, MagicMock, patch
 from typing import Any
 import pytest
 
-from multisocks.proxy.server import SocksServer, SOCKS_VERSION_5, SOCKS_VERSION_4
+from multisocks.proxy.server import (
+    SocksServer, SOCKS_VERSION_5, SOCKS_VERSION_4, SOCKS4_MAX_FIELD_LENGTH,
+    PIPE_READ_SIZE, PIPE_WRITE_HIGH_WATER, DEFAULT_LISTEN_BACKLOG, _listen_backlog, _RelayProtocol
+)
 from multisocks.proxy.proxy_manager import ProxyManager
 from multisocks.proxy.proxy_info import ProxyInfo
 
@@ -28,6 +32,18 @@ class MockStreamReader:
         self.position += n
         return result
 
+    async def readuntil(self, separator: bytes = b'\n') -> bytes:
+        """Read up to and including the separator"""
+        end = self.data.find(separator, self.position)
+        if end < 0:
+            partial = self.data[self.position:]
+            self.position = len(self.data)
+            raise asyncio.IncompleteReadError(partial=partial, expected=None)
+        end += len(separator)
+        result = self.data[self.position:end]
+        self.position = end
+        return result
+
     async def read(self, n: int) -> bytes:
         """Read up to n bytes"""
         if self.position >= len(self.data):
@@ -43,6 +59,7 @@ class MockStreamWriter:
         self.written_data = b''
         self.closed = False
         self.peername = ('127.0.0.1', 12345)
+        self.transport = MagicMock()
 
     def write(self, data: bytes) -> None:
         """Write data to stream"""
@@ -100,6 +117,45 @@ class TestSocksServer:
 
             mock_server.serve_forever.assert_called_once()
 
+    @pytest.mark.asyncio
+    async def test_start_server_reuse_port(self) -> None:
+        """Test reuse_port is passed through to the listener"""
+        server = SocksServer(ProxyManager([ProxyInfo("socks5", "proxy.example.com", 1080)]))
+
+        mock_server = AsyncMock()
+        mock_server.sockets = []
+        mock_server.serve_forever = AsyncMock(side_effect=asyncio.CancelledError())
+
+        with patch('multisocks.proxy.server.asyncio.start_server',
+                   return_value=mock_server) as mock_start:
+            with pytest.raises(asyncio.CancelledError):
+                await server.start('127.0.0.1', 1080, reuse_port=True)
+
+        assert mock_start.call_args[1]['reuse_port'] is True
+
+    @pytest.mark.asyncio
+    async def test_start_server_listen_backlog(self) -> None:
+        """Test the listener uses the kernel's backlog limit on every address family"""
+        server = SocksServer(ProxyManager([ProxyInfo("socks5", "proxy.example.com", 1080)]))
+
+        mock_server = AsyncMock()
+        mock_server.sockets = []
+        mock_server.serve_forever = AsyncMock(side_effect=asyncio.CancelledError())
+
+        with patch('multisocks.proxy.server._listen_backlog', return_value=8192), \
+                patch('multisocks.proxy.server.asyncio.start_server',
+                      return_value=mock_server) as mock_start:
+            with pytest.raises(asyncio.CancelledError):
+                await server.start('localhost', 1080)
+
+        assert mock_start.call_args[1]['backlog'] == 8192
+        assert 'family' not in mock_start.call_args[1]
+
+    def test_listen_backlog_falls_back_without_somaxconn(self) -> None:
+        """Test the default backlog is used when the kernel limit can't be read"""
+        with patch('builtins.open', side_effect=OSError("no procfs")):
+            assert _listen_backlog() == DEFAULT_LISTEN_BACKLOG
+
     @pytest.mark.asyncio
     async def test_stop_server(self) -> None:
         """Test server shutdown"""
@@ -136,14 +192,14 @@ class TestSocksServerClientHandling:
         manager = ProxyManager([proxy])
         server = SocksServer(manager)
 
-        # SOCKS5 version byte
-        reader = MockStreamReader(bytes([SOCKS_VERSION_5]))
+        # SOCKS5 version byte and method count, read together
+        reader = MockStreamReader(bytes([SOCKS_VERSION_5, 1]))
         writer = MockStreamWriter()
 
         with patch.object(server, '_handle_socks5') as mock_handle_socks5:
             await server._handle_client(reader, writer)
 
-            mock_handle_socks5.assert_called_once_with(reader, writer)
+            mock_handle_socks5.assert_called_once_with(reader, writer, 1)
 
     @pytest.mark.asyncio
     async def test_handle_client_socks4(self) -> None:
@@ -152,15 +208,34 @@ class TestSocksServerClientHandling:
         manager = ProxyManager([proxy])
         server = SocksServer(manager)
 
-        # SOCKS4 version byte
-        version_byte = bytes([SOCKS_VERSION_4])
-        reader = MockStreamReader(version_byte)
+        # SOCKS4 version byte and command, read together
+        head = bytes([SOCKS_VERSION_4, 1])
+        reader = MockStreamReader(head)
         writer = MockStreamWriter()
 
         with patch.object(server, '_handle_socks4') as mock_handle_socks4:
             await server._handle_client(reader, writer)
 
-            mock_handle_socks4.assert_called_once_with(version_byte, reader, writer)
+            mock_handle_socks4.assert_called_once_with(head, reader, writer)
+
+    @pytest.mark.asyncio
+    async def test_handle_client_socks4_request_continues_after_head(self) -> None:
+        """Test the SOCKS4 request is parsed correctly after the two-byte head"""
+        proxy = ProxyInfo("socks4", "proxy.example.com", 1080)
+        manager = ProxyManager([proxy])
+        server = SocksServer(manager)
+
+        data = (
+            bytes([SOCKS_VERSION_4, 1]) + struct.pack('!H', 8080)
+            + socket.inet_aton('10.1.2.3') + b'user\x00'
+        )
+        reader = MockStreamReader(data)
+        writer = MockStreamWriter()
+
+        with patch.object(server, '_handle_socks4_connect') as mock_connect:
+            await server._handle_client(reader, writer)
+
+        mock_connect.assert_called_once_with(reader, writer, '10.1.2.3', 8080)
 
     @pytest.mark.asyncio
     async def test_handle_client_unsupported_version(self) -> None:
@@ -170,7 +245,7 @@ class TestSocksServerClientHandling:
         server = SocksServer(manager)
 
         # Unsupported version
-        reader = MockStreamReader(bytes([0x99]))
+        reader = MockStreamReader(bytes([0x99, 0x01]))
         writer = MockStreamWriter()
 
         with patch('multisocks.proxy.server.logger') as mock_logger:
@@ -210,6 +285,7 @@ class TestSocksServerClientHandling:
             await server._handle_client(reader, writer)
 
             mock_logger.error.assert_called_once()
+            writer.transport.abort.assert_called_once()
 
 
 class TestSocksServerSocks5:
@@ -240,7 +316,7 @@ class TestSocksServerSocks5:
         mock_stream.reader = AsyncMock()
         mock_stream.writer = AsyncMock()
 
-        with patch('multisocks.proxy.server.Proxy') as mock_proxy_class:
+        with patch('multisocks.proxy.proxy_info.Proxy') as mock_proxy_class:
             mock_proxy = AsyncMock()
             mock_proxy.connect.return_value = mock_stream
             mock_proxy_class.return_value = mock_proxy
@@ -255,6 +331,45 @@ class TestSocksServerSocks5:
 
                 mock_proxy_data.assert_called_once()
 
+    @pytest.mark.asyncio
+    async def test_socks5_replies_wire_format(self) -> None:
+        """Test the prebuilt SOCKS5 replies match the protocol layout"""
+        server = SocksServer(AsyncMock())
+        writer = MockStreamWriter()
+
+        await server._send_socks5_response(writer, 0x00)
+        await server._send_socks5_success_response(writer)
+        await server._send_socks5_error_response(writer, 0x07)
+        await server._send_socks5_error_response(writer, 0x42)
+
+        assert writer.written_data == (
+            b'\x05\x00'
+            + b'\x05\x00\x00\x01' + b'\x00' * 6
+            + b'\x05\x07\x00\x01' + b'\x00' * 6
+            + b'\x05\x42\x00\x01' + b'\x00' * 6
+        )
+
+    @pytest.mark.asyncio
+    async def test_handle_socks5_connect_tracks_active_connections(self) -> None:
+        """Test the proxy's active connection count covers the relayed connection"""
+        proxy_info = ProxyInfo("socks5", "proxy.example.com", 1080)
+        manager = AsyncMock()
+        manager.get_proxy.return_value = proxy_info
+        server = SocksServer(manager)
+        seen_during_relay = []
+
+        async def relay(*_args: Any) -> None:
+            seen_during_relay.append(proxy_info.active_connections)
+
+        with patch.object(server, '_connect_through_proxy', return_value=MagicMock()):
+            with patch.object(server, '_proxy_data', side_effect=relay):
+                await server._handle_socks5_connect(  # pylint: disable=protected-access
+                    MockStreamReader(b''), MockStreamWriter(), "example.com", 80
+                )
+
+        assert seen_during_relay == [1]
+        assert proxy_info.active_connections == 0
+
     @pytest.mark.asyncio
     async def test_handle_socks5_unsupported_auth(self) -> None:
         """Test SOCKS5 with unsupported authentication method"""
@@ -323,7 +438,7 @@ class TestSocksServerSocks5:
         mock_stream.reader = AsyncMock()
         mock_stream.writer = AsyncMock()
 
-        with patch('multisocks.proxy.server.Proxy') as mock_proxy_class:
+        with patch('multisocks.proxy.proxy_info.Proxy') as mock_proxy_class:
             mock_proxy = AsyncMock()
             mock_proxy.connect.return_value = mock_stream
             mock_proxy_class.return_value = mock_proxy
@@ -362,7 +477,7 @@ class TestSocksServerSocks5:
         mock_stream.reader = AsyncMock()
         mock_stream.writer = AsyncMock()
 
-        with patch('multisocks.proxy.server.Proxy') as mock_proxy_class:
+        with patch('multisocks.proxy.proxy_info.Proxy') as mock_proxy_class:
             mock_proxy = AsyncMock()
             mock_proxy.connect.return_value = mock_stream
             mock_proxy_class.return_value = mock_proxy
@@ -395,7 +510,7 @@ class TestSocksServerSocks5:
         reader = MockStreamReader(data)
         writer = MockStreamWriter()
 
-        with patch('multisocks.proxy.server.Proxy') as mock_proxy_class:
+        with patch('multisocks.proxy.proxy_info.Proxy') as mock_proxy_class:
             mock_proxy = AsyncMock()
             mock_proxy.connect.side_effect = RuntimeError("Connection failed")
             mock_proxy_class.return_value = mock_proxy
@@ -410,10 +525,48 @@ class TestSocksServerSocks5:
             # Proxy should be marked as failed
             assert proxy_info.fail_count > 0
 
+    @pytest.mark.asyncio
+    async def test_connect_through_proxy_times_out(self) -> None:
+        """Test a stalled upstream connect is abandoned and the proxy marked failed"""
+        proxy = ProxyInfo("socks5", "proxy.example.com", 1080)
+        server = SocksServer(ProxyManager([proxy]))
+
+        async def stall(**_kwargs: Any) -> None:
+            await asyncio.sleep(3600)
+
+        with patch('multisocks.proxy.proxy_info.Proxy') as mock_proxy_class:
+            mock_proxy_class.return_value.connect = stall
+            with patch('multisocks.proxy.server.PROXY_CONNECT_TIMEOUT', 0.01):
+                with pytest.raises(asyncio.TimeoutError):
+                    await server._connect_through_proxy(proxy, 'example.com', 80)
+
+        assert proxy.fail_count == 1
+
 
 class TestSocksServerSocks4:
     """Test SOCKS4 protocol handling"""
 
+    @pytest.mark.asyncio
+    async def test_read_null_terminated_string(self) -> None:
+        """Test a NUL-terminated field is read in one call, leaving the rest buffered"""
+        server = SocksServer(ProxyManager([ProxyInfo("socks5", "proxy.example.com", 1080)]))
+        reader = asyncio.StreamReader()
+        reader.feed_data(b'user\x00example.com\x00rest')
+
+        assert await server._read_null_terminated_string(reader) == b'user'
+        assert await server._read_null_terminated_string(reader) == b'example.com'
+        assert await reader.readexactly(4) == b'rest'
+
+    @pytest.mark.asyncio
+    async def test_read_null_terminated_string_too_long(self) -> None:
+        """Test an oversized SOCKS4 field is rejected"""
+        server = SocksServer(ProxyManager([ProxyInfo("socks5", "proxy.example.com", 1080)]))
+        reader = asyncio.StreamReader()
+        reader.feed_data(b'a' * (SOCKS4_MAX_FIELD_LENGTH + 1) + b'\x00')
+
+        with pytest.raises(ValueError):
+            await server._read_null_terminated_string(reader)
+
     @pytest.mark.asyncio
     async def test_handle_socks4_basic_connect(self) -> None:
         """Test basic SOCKS4 connect request"""
@@ -439,7 +592,7 @@ class TestSocksServerSocks4:
         mock_stream.reader = AsyncMock()
         mock_stream.writer = AsyncMock()
 
-        with patch('multisocks.proxy.server.Proxy') as mock_proxy_class:
+        with patch('multisocks.proxy.proxy_info.Proxy') as mock_proxy_class:
             mock_proxy = AsyncMock()
             mock_proxy.connect.return_value = mock_stream
             mock_proxy_class.return_value = mock_proxy
@@ -483,7 +636,7 @@ class TestSocksServerSocks4:
         mock_stream.reader = AsyncMock()
         mock_stream.writer = AsyncMock()
 
-        with patch('multisocks.proxy.server.Proxy') as mock_proxy_class:
+        with patch('multisocks.proxy.proxy_info.Proxy') as mock_proxy_class:
             mock_proxy = AsyncMock()
             mock_proxy.connect.return_value = mock_stream
             mock_proxy_class.return_value = mock_proxy
@@ -542,7 +695,7 @@ class TestSocksServerSocks4:
         reader = MockStreamReader(data)
         writer = MockStreamWriter()
 
-        with patch('multisocks.proxy.server.Proxy') as mock_proxy_class:
+        with patch('multisocks.proxy.proxy_info.Proxy') as mock_proxy_class:
             mock_proxy = AsyncMock()
             mock_proxy.connect.side_effect = RuntimeError("Connection failed")
             mock_proxy_class.return_value = mock_proxy
@@ -574,22 +727,152 @@ class TestSocksServerDataProxying:
         mock_target_stream.reader = target_reader
         mock_target_stream.writer = target_writer
 
-        # Mock the pipe operations to complete immediately
-        with patch.object(server, '_pipe') as mock_pipe:
-            mock_pipe.return_value = AsyncMock()
+        async def pipe(_reader: Any, _writer: Any) -> None:
+            await asyncio.sleep(0)
 
-            with patch('multisocks.proxy.server.asyncio.wait') as mock_wait:
-                # Simulate both tasks completing
-                task1 = AsyncMock()
-                task2 = AsyncMock()
-                mock_wait.return_value = ([task1], [task2])
+        # Mock the pipe operations to complete after yielding once
+        with patch.object(server, '_pipe', side_effect=pipe) as mock_pipe:
+            await server._proxy_data(client_reader, client_writer, mock_target_stream)
 
-                await server._proxy_data(client_reader, client_writer, mock_target_stream)
+            # Both directions should have been piped
+            assert mock_pipe.await_count == 2
+            mock_pipe.assert_any_await(client_reader, target_writer)
+            mock_pipe.assert_any_await(target_reader, client_writer)
+
+    @pytest.mark.asyncio
+    async def test_proxy_data_stops_other_direction(self) -> None:
+        """Test the background direction is cancelled once the inline one finishes"""
+        proxy = ProxyInfo("socks5", "proxy.example.com", 1080)
+        manager = ProxyManager([proxy])
+        server = SocksServer(manager)
+
+        client_reader = AsyncMock()
+        target_reader = AsyncMock()
+        mock_target_stream = MagicMock(reader=target_reader, writer=MockStreamWriter())
+        background_cancelled = asyncio.Event()
+
+        async def pipe(reader: Any, _writer: Any) -> None:
+            if reader is client_reader:
+                try:
+                    await asyncio.sleep(3600)
+                except asyncio.CancelledError:
+                    background_cancelled.set()
+                    raise
+            else:
+                # Let the background direction start before finishing
+                await asyncio.sleep(0)
+
+        with patch.object(server, '_pipe', side_effect=pipe):
+            await asyncio.wait_for(
+                server._proxy_data(client_reader, MockStreamWriter(), mock_target_stream),
+                timeout=5,
+            )
+
+        assert background_cancelled.is_set()
+
+    @pytest.mark.asyncio
+    async def test_proxy_data_raises_write_buffer_limits(self) -> None:
+        """Test relayed transports get a larger write high-water mark"""
+        proxy = ProxyInfo("socks5", "proxy.example.com", 1080)
+        manager = ProxyManager([proxy])
+        server = SocksServer(manager)
 
-                # Should have created two pipe tasks
-                assert mock_pipe.call_count == 2
-                # Should have cancelled pending tasks
-                task2.cancel.assert_called_once()
+        client_writer = MockStreamWriter()
+        client_writer.transport = MagicMock(spec=asyncio.WriteTransport)
+        target_stream = MagicMock(reader=AsyncMock(), writer=MockStreamWriter())
+
+        with patch.object(server, '_pipe', new=AsyncMock()):
+            await server._proxy_data(AsyncMock(), client_writer, target_stream)
+
+        client_writer.transport.set_write_buffer_limits.assert_called_once_with(
+            high=PIPE_WRITE_HIGH_WATER
+        )
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("use_splice", [False, True])
+    async def test_proxy_data_relays_real_transports(self, use_splice: bool) -> None:
+        """Test real transports are relayed, including bytes buffered before the hand-off"""
+        if use_splice and not hasattr(os, "splice"):
+            pytest.skip("splice(2) is not available on this platform")
+        relay_method = '_splice_relay' if use_splice else '_protocol_relay'
+        proxy = ProxyInfo("socks5", "proxy.example.com", 1080)
+        manager = ProxyManager([proxy])
+        server = SocksServer(manager)
+
+        async def echo(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+            data = await reader.read(1024)
+            while data:
+                writer.write(data)
+                await writer.drain()
+                data = await reader.read(1024)
+            writer.close()
+
+        relay_done = asyncio.Event()
+
+        async def front(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+            # Let the client's early bytes land in the stream buffer first
+            await reader.readexactly(1)
+            target_reader, target_writer = await asyncio.open_connection(*echo_addr)
+            target_stream = MagicMock(reader=target_reader, writer=target_writer)
+            await server._proxy_data(reader, writer, target_stream)
+            await writer.wait_closed()
+            relay_done.set()
+
+        echo_server = await asyncio.start_server(echo, "127.0.0.1", 0)
+        echo_addr = echo_server.sockets[0].getsockname()[:2]
+        front_server = await asyncio.start_server(front, "127.0.0.1", 0)
+        front_addr = front_server.sockets[0].getsockname()[:2]
+        async with echo_server, front_server:
+            with patch.object(server, '_pipe') as mock_pipe, \
+                    patch.object(SocksServer, '_can_splice', return_value=use_splice), \
+                    patch.object(server, relay_method,
+                                 wraps=getattr(server, relay_method)) as mock_relay:
+                reader, writer = await asyncio.open_connection(*front_addr)
+                writer.write(b"xearly")
+                payload = bytes(range(256)) * 1024
+                writer.write(payload)
+                await writer.drain()
+
+                echoed = await reader.readexactly(len(b"early") + len(payload))
+                assert echoed == b"early" + payload
+
+                writer.close()
+                await asyncio.wait_for(relay_done.wait(), timeout=5)
+                mock_pipe.assert_not_called()
+                mock_relay.assert_called_once()
+
+    def test_relay_protocol_writes_without_copy_until_data_queues(self) -> None:
+        """Test chunks go out by reference while the peer's write buffer is empty"""
+        peer = MagicMock(spec=asyncio.Transport)
+        relay = _RelayProtocol(peer, MagicMock(), MagicMock())
+
+        def receive(data: bytes, queued_before: int, queued_after: int) -> memoryview:
+            buffer = relay.get_buffer(-1)
+            buffer[:len(data)] = data
+            peer.get_write_buffer_size.side_effect = [queued_before, queued_after]
+            relay.buffer_updated(len(data))
+            return buffer
+
+        first = receive(b"sent", 0, 0)
+        sent = peer.write.call_args.args[0]
+        assert isinstance(sent, memoryview)
+        assert relay.get_buffer(-1) is first
+
+        # A partly sent chunk may be kept by reference, so the next read uses another buffer
+        receive(b"tail", 0, 4)
+        second = relay.get_buffer(-1)
+        assert second is not first
+
+        peer.get_write_buffer_size.side_effect = [4]
+        second[:6] = b"queued"
+        relay.buffer_updated(6)
+        snapshot = peer.write.call_args.args[0]
+        assert isinstance(snapshot, bytes)
+        assert snapshot == b"queued"
+
+        # Once the queue drained, the first buffer is free to take the next read
+        receive(b"again", 0, 5)
+        assert relay.get_buffer(-1) is first
 
     @pytest.mark.asyncio
     async def test_pipe_data_transfer(self) -> None:
@@ -608,6 +891,7 @@ class TestSocksServerDataProxying:
 
         # Should have written the data
         assert writer.written_data == b'helloworld'
+        reader.read.assert_called_with(PIPE_READ_SIZE)
 
     @pytest.mark.asyncio
     async def test_pipe_handles_connection_errors(self) -> None:
@@ -710,6 +994,24 @@ class TestSocksServerAddressParsing:
         assert addr == '::1'
         assert port == 80
 
+    @pytest.mark.asyncio
+    async def test_parse_socks5_address_fixed_length_single_read(self) -> None:
+        """Test IPv4 and IPv6 addresses are read together with the port"""
+        proxy = ProxyInfo("socks5", "proxy.example.com", 1080)
+        manager = ProxyManager([proxy])
+        server = SocksServer(manager)
+
+        for atyp, addr_bytes, expected in (
+            (1, socket.inet_aton('10.0.0.1'), '10.0.0.1'),
+            (4, socket.inet_pton(socket.AF_INET6, '2001:db8::1'), '2001:db8::1'),
+        ):
+            reader = MockStreamReader(addr_bytes + struct.pack('!H', 443))
+            with patch.object(reader, 'readexactly', wraps=reader.readexactly) as mock_read:
+                addr, port = await server._parse_socks5_address(reader, atyp)
+
+            assert (addr, port) == (expected, 443)
+            mock_read.assert_called_once_with(len(addr_bytes) + 2)
+
     @pytest.mark.asyncio
     async def test_parse_socks5_address_unsupported_type(self) -> None:
         """Test parsing unsupported address type"""
@@ -812,7 +1114,7 @@ class TestSocksServerEdgeCases:
 
     @pytest.mark.asyncio
     async def test_proxy_data_exception_handling(self) -> None:
-        """Test proxy data handling with exceptions (covers lines 345-346)"""
+        """Test proxy data handling with exceptions"""
         proxy = ProxyInfo("socks5", "proxy.example.com", 1080)
         manager = ProxyManager([proxy])
         server = SocksServer(manager)
@@ -828,19 +1130,13 @@ class TestSocksServerEdgeCases:
         mock_target_stream.writer = target_writer
 
         # Mock the pipe operations to raise an exception
-        with patch.object(server, '_pipe', side_effect=Exception("Pipe error")):
-            with patch('multisocks.proxy.server.asyncio.wait') as mock_wait:
-                # Simulate task completion with exception
-                task1 = AsyncMock()
-                task1.result.side_effect = Exception("Task error")  # covers lines 345-346
-                task2 = AsyncMock()
-                mock_wait.return_value = ([task1], [task2])
-
-                # Should handle exception gracefully (covers lines 345-346)
+        with patch.object(server, '_pipe', side_effect=Exception("Pipe error")) as mock_pipe:
+            with patch('multisocks.proxy.server.logger') as mock_logger:
+                # Should handle exception gracefully
                 await server._proxy_data(client_reader, client_writer, mock_target_stream)
 
-                # Should have cancelled pending tasks
-                task2.cancel.assert_called_once()
+            assert mock_pipe.call_count == 2
+            mock_logger.debug.assert_called_with("Pipe task error: %s", mock_pipe.side_effect)
 
     @pytest.mark.asyncio
     async def test_pipe_writer_close_exception(self) -> None: